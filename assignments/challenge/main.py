@@ -8,6 +8,8 @@
 #-----------------------------------------------------------------------------
 
 import os
+import re
+from collections import Counter
 
 clamp = lambda n, smallest, largest: max(smallest, min(n, largest))
 
@@ -42,48 +44,151 @@ def requireValidInput(inpStr: str, incorrectNote: str, checker) -> str:
 
 sentenceEndTokens = [".", "?", "!"]
 falseSentenceEndTokens = [":--"]
-wordFrequencyChart = {}
+wordFrequencyChart = Counter()
 allText = ""
 
+# Byte versions of the tokens and character classes, used to count plain ASCII text without decoding it
+asciiSentenceEndTokens = [token.encode() for token in sentenceEndTokens]
+asciiFalseSentenceEndTokens = [token.encode() for token in falseSentenceEndTokens]
+asciiWhitespace = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f" # Everything str.strip() removes in the ASCII range
+asciiLowerTable = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", b"abcdefghijklmnopqrstuvwxyz")
+asciiNonWordBytes = bytes(byte for byte in range(128) if not (chr(byte).isalnum() or chr(byte) in "' \n"))
+chunkSize = 1 << 20
+
 # Margin of error: 100
 wordCount = 0
 paragraphCount = 0
 sentenceCount = 0
 
-print("--- Text Parser ---")
+def countSyllables(word):
+  # Each group of vowels is roughly one syllable, apart from a silent e at the end
+  syllables = len(re.findall(r"[aeiouy]+", word))
+  if word.endswith("e") and not word.endswith(("le", "ee")) and syllables > 1:
+    syllables -= 1
 
-fname = requireValidInput("Please input the name of the file you'd like to parse: ", "Please provide a real file.", lambda myFname: os.path.exists(myFname))  
+  return max(syllables, 1) if re.search(r"[a-z]", word) else 0
 
-with open(fname) as file:
-  allText = file.read()
-  file.seek(0)
+def getReadabilityStats():
+  # Everything here comes from the frequency chart, so each distinct word is only looked at once
+  totalLetters = 0
+  totalSyllables = 0
   
-  for line in file.readlines():
-    if line != "\n":
-      paragraphCount += 1
-      
-    for token in sentenceEndTokens:
-      sentenceCount += line.count(token)
+  for word, freq in wordFrequencyChart.items():
+    totalLetters += len(word) * freq
+    totalSyllables += countSyllables(word) * freq
+
+  wordsPerSentence = wordCount / max(sentenceCount, 1)
+  syllablesPerWord = totalSyllables / max(wordCount, 1)
+
+  return {
+    "Syllable Count": totalSyllables,
+    "Average Word Length": round(totalLetters / max(wordCount, 1), 2),
+    "Type/Token Ratio": round(len(wordFrequencyChart) / max(wordCount, 1), 4),
+    "Flesch Reading Ease": round(206.835 - 1.015 * wordsPerSentence - 84.6 * syllablesPerWord, 2),
+    "Flesch-Kincaid Grade Level": round(0.39 * wordsPerSentence + 11.8 * syllablesPerWord - 15.59, 2)
+  }
+
+def countUnicodeLine(line):
+  global wordCount, paragraphCount, sentenceCount
+
+  if line != "\n":
+    paragraphCount += 1
+    
+  for token in sentenceEndTokens:
+    sentenceCount += line.count(token)
 
-    for token in falseSentenceEndTokens:
-      sentenceCount -= line.count(token)
+  for token in falseSentenceEndTokens:
+    sentenceCount -= line.count(token)
 
-    line.strip()
+  line.strip()
+  
+  for word in line.split(" "):
+    word = word.lower().strip()
+    cleanedWord = ''.join([char for char in word if char.isalnum() or char in "'"])
     
-    for word in line.split(" "):
-      word = word.lower().strip()
-      cleanedWord = ''.join([char for char in word if char.isalnum() or char in "'"])
+    if word.strip() == "":
+      continue 
       
-      if word.strip() == "":
-        continue 
-        
-      if cleanedWord in wordFrequencyChart:
-        wordFrequencyChart[cleanedWord] += 1
-      else:
-        wordFrequencyChart[cleanedWord] = 1
+    wordFrequencyChart[cleanedWord] += 1
+    wordCount += 1
+
+def countAsciiChunk(chunk):
+  # chunk is made of whole lines of pure ASCII, so every line can be handled at once with bytes methods
+  global wordCount, paragraphCount, sentenceCount
+
+  lines = chunk.split(b"\n")
+  paragraphCount += len(lines) - lines.count(b"")
+
+  for token in asciiSentenceEndTokens:
+    sentenceCount += chunk.count(token)
+
+  for token in asciiFalseSentenceEndTokens:
+    sentenceCount -= chunk.count(token)
+
+  # Newlines only ever end the last word of a line, so they can be treated as spaces
+  rawWords = chunk.replace(b"\n", b" ").split(b" ")
+  cleanedWords = chunk.translate(asciiLowerTable, asciiNonWordBytes).decode("ascii").replace("\n", " ").split(" ")
+
+  # Words with no letters left after cleaning still count unless they were only whitespace
+  words = [cleanedWord for rawWord, cleanedWord in zip(rawWords, cleanedWords) if cleanedWord or rawWord.strip(asciiWhitespace)]
+
+  wordFrequencyChart.update(words)
+  wordCount += len(words)
 
-      wordCount += 1
+def countText(rawText):
+  chunkStart = 0
 
+  while chunkStart < len(rawText):
+    # Always cut chunks at the end of a line
+    chunkEnd = rawText.find(b"\n", chunkStart + chunkSize)
+    chunkEnd = len(rawText) if chunkEnd == -1 else chunkEnd + 1
+    chunk = rawText[chunkStart:chunkEnd]
+
+    if chunk.isascii():
+      countAsciiChunk(chunk)
+    else:
+      # Only the lines with non-ASCII characters need full Unicode handling, runs of ASCII lines between them still go through the fast path
+      asciiRunStart = chunkStart
+      lineStart = chunkStart
+
+      while lineStart < chunkEnd:
+        lineEnd = rawText.find(b"\n", lineStart, chunkEnd)
+        lineEnd = chunkEnd if lineEnd == -1 else lineEnd + 1
+        line = rawText[lineStart:lineEnd]
+
+        if not line.isascii():
+          if asciiRunStart < lineStart:
+            countAsciiChunk(rawText[asciiRunStart:lineStart])
+          countUnicodeLine(line.decode("utf-8"))
+          asciiRunStart = lineEnd
+
+        lineStart = lineEnd
+
+      if asciiRunStart < chunkEnd:
+        countAsciiChunk(rawText[asciiRunStart:chunkEnd])
+
+    chunkStart = chunkEnd
+
+print("--- Text Parser ---")
+
+fname = requireValidInput("Please input the name of the file you'd like to parse: ", "Please provide a real file.", lambda myFname: os.path.exists(myFname))  
+
+with open(fname, "rb") as file:
+  # Translate newlines the same way text mode does
+  rawText = file.read().replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+try:
+  allText = rawText.decode("utf-8")
+except UnicodeDecodeError:
+  # Not UTF-8, so read it as text and go through it line by line instead
+  with open(fname) as file:
+    allText = file.read()
+    file.seek(0)
+    
+    for line in file.readlines():
+      countUnicodeLine(line)
+else:
+  countText(rawText)
 
 wordFrequencyChart = dict(sorted(wordFrequencyChart.items(), key=lambda item: item[1], reverse=True))
 
@@ -91,6 +196,9 @@ print("Paragraph Count:", paragraphCount)
 print("Word Count:", wordCount)
 print("Sentence Count:", sentenceCount)
 
+for statName, statValue in getReadabilityStats().items():
+  print(f"{statName}:", statValue)
+
 while True:
   choice = requireValidInput("What would you like to do? All Word Freq(af), Word Freq (f), Search (s), Quit (q): ", "Please provide a valid choice (f, s, q)", lambda inp: inp.lower() in "afsq")
 
@@ -0,0 +1,149 @@
+# -----------------------------------------------------------------------------
+# Name:        Squared Magic (benchmark)
+# Purpose:     Times the core Squared Magic operations for growing grid sizes to show how they scale
+#
+# Author:      Aritro Saha
+# Created:     19-Oct-2026
+# Updated:     19-Oct-2026
+# -----------------------------------------------------------------------------
+
+import argparse
+import io
+import math
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+from random import Random
+from time import perf_counter
+
+from main import buildMagicSquare, checkGrid, createGameState, printGrid, applyMove, maxViewportSize
+
+# How fast each operation is allowed to grow, as the power of n (checking every cell is n^2, one move should barely grow at all)
+maxExponents = {
+    "setup": 2.5,
+    "checkGrid": 2.5,
+    "printGrid": 1.5,
+    "move": 1.0
+}
+
+movesPerRun = 1000
+
+
+def getRenderSettings(gridSize, magicConst):
+    # Same as the game: the longest number plus padding, and a viewport for large grids
+    viewport = [0, 0, maxViewportSize] if gridSize > maxViewportSize else None
+    return len(str(magicConst)) + 2, viewport
+
+
+def runSetup(myGrid, magicConst):
+    createGameState([row[:] for row in myGrid], magicConst, (0, 0))
+
+
+def runCheckGrid(myGrid, magicConst):
+    checkGrid(myGrid, magicConst)
+
+
+def runPrintGrid(gameState, maxNumLen, viewport):
+    # Start from an empty render cache so the whole frame is formatted, like the first time it's shown
+    gameState["renderCache"] = {"columns": None, "rows": {}, "cellPaddings": []}
+    with redirect_stdout(io.StringIO()):
+        printGrid(gameState, maxNumLen, viewport)
+
+
+def runMoves(gameState, moves):
+    # Every move goes through the same checks as the game (position, then number) before it's made
+    for action, posX, posY, newNumber in moves:
+        applyMove(gameState, action, posX, posY, newNumber)
+
+
+def measure(repeatCount, operation, *args):
+    # Best time of a few runs (the least affected by everything else going on), then the peak memory of one more run
+    bestTime = math.inf
+    for runIdx in range(repeatCount):
+        timeStart = perf_counter()
+        operation(*args)
+        bestTime = min(bestTime, perf_counter() - timeStart)
+
+    tracemalloc.start()
+    operation(*args)
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return bestTime, peakMemory
+
+
+def benchmarkSize(gridSize, repeatCount=3):
+    # Returns {operation: (time, peak memory)} for one grid size
+    myGrid = buildMagicSquare(gridSize)
+    magicConst = gridSize * (gridSize ** 2 + 1) // 2
+    gameState = createGameState([row[:] for row in myGrid], magicConst, (0, 0))
+    maxNumLen, viewport = getRenderSettings(gridSize, magicConst)
+
+    # Take a number out and put it back, which keeps the grid the same after every run
+    randomGenerator = Random(gridSize)
+    moves = []
+    for moveIdx in range(movesPerRun // 2):
+        posX, posY = randomGenerator.randrange(1, gridSize), randomGenerator.randrange(1, gridSize)
+        moves.append(("r", posX + 1, posY + 1, 0))
+        moves.append(("a", posX + 1, posY + 1, myGrid[posY][posX]))
+
+    return {
+        "setup": measure(repeatCount, runSetup, myGrid, magicConst),
+        "checkGrid": measure(repeatCount, runCheckGrid, myGrid, magicConst),
+        "printGrid": measure(repeatCount, runPrintGrid, gameState, maxNumLen, viewport),
+        "move": measure(repeatCount, runMoves, gameState, moves)
+    }
+
+
+def getExponent(smallSize, smallTime, largeSize, largeTime):
+    # The k in time ~ n^k between two sizes
+    return math.log(max(largeTime, 1e-9) / max(smallTime, 1e-9)) / math.log(largeSize / smallSize)
+
+
+def printScalingTable(sizes, results):
+    # Returns the operations that grew faster than they're allowed to
+    tooSlow = []
+    print(f"{'Operation':<10} {'n':>6} {'Time (ms)':>12} {'Peak (KB)':>12} {'Growth':>8}")
+
+    for operation in maxExponents:
+        exponents = []
+        for sizeIdx, gridSize in enumerate(sizes):
+            runTime, peakMemory = results[gridSize][operation]
+            growth = ""
+
+            if sizeIdx > 0:
+                exponents.append(getExponent(sizes[sizeIdx - 1], results[sizes[sizeIdx - 1]][operation][0], gridSize, runTime))
+                growth = f"n^{exponents[-1]:.2f}"
+
+            print(f"{operation:<10} {str(gridSize):>6} {runTime * 1000:>12.3f} {peakMemory / 1024:>12.1f} {growth:>8}")
+
+        # The overall growth from the smallest to the largest size, since tiny sizes are mostly overhead
+        if len(sizes) > 1:
+            overallExponent = getExponent(sizes[0], results[sizes[0]][operation][0], sizes[-1], results[sizes[-1]][operation][0])
+            print(f"{'':<10} {'overall':>6} {'':>12} {'':>12} {f'n^{overallExponent:.2f}':>8}")
+
+            if overallExponent > maxExponents[operation]:
+                tooSlow.append(operation)
+        print()
+
+    return tooSlow
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="See how the core Squared Magic operations scale with the grid size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 10, 30, 100, 300, 1000, 3000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per operation (the best time is kept)")
+    parser.add_argument("--check", action="store_true", help="fail if an operation grows faster than it's allowed to")
+    args = parser.parse_args()
+
+    sizes = sorted(args.sizes)
+
+    results = {}
+    for gridSize in sizes:
+        results[gridSize] = benchmarkSize(gridSize, args.repeat)
+
+    tooSlow = printScalingTable(sizes, results)
+
+    if args.check and tooSlow:
+        print(f"Growing too fast: {', '.join(tooSlow)}")
+        sys.exit(1)
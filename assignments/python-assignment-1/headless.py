@@ -0,0 +1,183 @@
+# -----------------------------------------------------------------------------
+# Name:        Squared Magic (headless runner)
+# Purpose:     Replays recorded Squared Magic games and benchmarks bots without any prompts
+#
+# Author:      Aritro Saha
+# Created:     19-Oct-2026
+# Updated:     19-Oct-2026
+# -----------------------------------------------------------------------------
+
+import argparse
+from random import Random
+from time import perf_counter
+
+from main import createGame, applyMove, isGridSolved, getSolveStats, getCell
+from leaderboard import openLeaderboard, addResults
+
+# Move files have one game after another. Each game starts with a line "game size startX startY startNumber",
+# followed by one move per line ("a x y number", "c x y number", or "r x y"). Positions count from 1.
+
+
+def readMoveFile(fname):
+    # Returns a list of (size, startPos, startNum, moves) for every game in the file
+    games = []
+
+    with open(fname) as file:
+        for line in file:
+            parts = line.split()
+
+            # Skip blank lines and comments
+            if not parts or parts[0].startswith("#"):
+                continue
+
+            if parts[0] == "game":
+                size, startX, startY, startNum = [int(part) for part in parts[1:5]]
+                games.append((size, (startX - 1, startY - 1), startNum, []))
+            else:
+                action, posX, posY = parts[0], int(parts[1]), int(parts[2])
+                newNumber = int(parts[3]) if len(parts) > 3 else 0
+                games[-1][3].append((action, posX, posY, newNumber))
+
+    return games
+
+
+def writeMoveFile(fname, games):
+    with open(fname, "w") as file:
+        for size, startPos, startNum, moves in games:
+            file.write(f"game {size} {startPos[0] + 1} {startPos[1] + 1} {startNum}\n")
+
+            for action, posX, posY, newNumber in moves:
+                if action == "r":
+                    file.write(f"r {posX} {posY}\n")
+                else:
+                    file.write(f"{action} {posX} {posY} {newNumber}\n")
+
+
+def solutionBot(gameState, solutionGrid, randomGenerator, mistakeRate):
+    # Fills in the solution in a random order, sometimes putting a wrong number down first and fixing it on the next move
+    gridSize = len(solutionGrid)
+    cells = [(x, y) for y in range(gridSize) for x in range(gridSize)
+             if (x, y) != gameState["startPos"] and solutionGrid[y][x] != getCell(gameState, x, y)]
+    randomGenerator.shuffle(cells)
+
+    for x, y in cells:
+        solutionNumber = solutionGrid[y][x]
+
+        if randomGenerator.random() < mistakeRate:
+            # The wrong number is changed straight away, so it never blocks a number the solution needs
+            wrongNumber = randomGenerator.randrange(gridSize ** 2 + 1, gameState["magicConstant"])
+            if wrongNumber not in gameState["usedNumbers"] and wrongNumber != solutionNumber:
+                yield "a", x + 1, y + 1, wrongNumber
+
+        if solutionNumber == 0:
+            yield "r", x + 1, y + 1, 0
+        elif getCell(gameState, x, y) == 0:
+            yield "a", x + 1, y + 1, solutionNumber
+        else:
+            yield "c", x + 1, y + 1, solutionNumber
+
+
+def playMoves(gameState, moves):
+    # Returns how many of the moves weren't allowed
+    rejectedMoves = 0
+
+    for action, posX, posY, newNumber in moves:
+        if applyMove(gameState, action, posX, posY, newNumber) is not None:
+            rejectedMoves += 1
+
+    return rejectedMoves
+
+
+def printRunStats(gameCount, solvedCount, rejectedMoves, timeStart, timeEnd, moveCount):
+    # Same stats as the game prints at the end, plus how fast the moves went
+    timeToComplete, timePerMove = getSolveStats(timeStart, timeEnd, moveCount)
+
+    print(f"Games: {str(gameCount)} ({str(solvedCount)} solved)")
+    print(f"Total time: {str(timeToComplete)}s")
+    print(f"Total moves: {str(moveCount)} move(s) ({str(rejectedMoves)} not allowed)")
+    print(f"Time per move: {str(timePerMove)}s")
+    print(f"Moves per second: {moveCount / max(timeEnd - timeStart, 1e-9):,.0f}")
+
+
+def replayGames(fnames):
+    games = [game for fname in fnames for game in readMoveFile(fname)]
+    gameStates = [createGame(size, startPos, startNum)[0] for size, startPos, startNum, moves in games]
+
+    # Only the moves themselves are timed
+    rejectedMoves = 0
+    timeStart = perf_counter()
+    for gameState, (size, startPos, startNum, moves) in zip(gameStates, games):
+        rejectedMoves += playMoves(gameState, moves)
+    timeEnd = perf_counter()
+
+    printRunStats(len(games), sum(isGridSolved(gameState) for gameState in gameStates), rejectedMoves,
+                  timeStart, timeEnd, sum(gameState["moveCount"] for gameState in gameStates))
+
+
+def runBotGames(size, gameCount, seed, mistakeRate, recordFname=None, leaderboardFname=None):
+    randomGenerator = Random(seed)
+    recordedGames = []
+    results = []
+    moveCount = 0
+    solvedCount = 0
+    rejectedMoves = 0
+
+    timeStart = perf_counter()
+    for gameIdx in range(gameCount):
+        gameState, solutionGrid = createGame(size, randomGenerator=randomGenerator, sparse=False)
+        moves = []
+        gameStart = perf_counter()
+
+        for move in solutionBot(gameState, solutionGrid, randomGenerator, mistakeRate):
+            if applyMove(gameState, *move) is not None:
+                rejectedMoves += 1
+            moves.append(move)
+
+        moveCount += gameState["moveCount"]
+        solvedCount += isGridSolved(gameState)
+
+        if leaderboardFname and isGridSolved(gameState):
+            results.append((size, perf_counter() - gameStart, gameState["moveCount"]))
+
+        if recordFname:
+            startPos = gameState["startPos"]
+            recordedGames.append((size, startPos, getCell(gameState, *startPos), moves))
+    timeEnd = perf_counter()
+
+    printRunStats(gameCount, solvedCount, rejectedMoves, timeStart, timeEnd, moveCount)
+    print(f"Games per second: {gameCount / max(timeEnd - timeStart, 1e-9):,.0f}")
+
+    if recordFname:
+        writeMoveFile(recordFname, recordedGames)
+
+    # All of the results go in at once
+    if leaderboardFname:
+        leaderboard = openLeaderboard(leaderboardFname)
+        addResults(leaderboard, results)
+        leaderboard.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Squared Magic without any prompts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    replayParser = subparsers.add_parser("replay", help="replay games from move files")
+    replayParser.add_argument("fnames", nargs="+")
+
+    botParser = subparsers.add_parser("bot", help="let a bot play random games")
+    botParser.add_argument("--size", type=int, default=3)
+    botParser.add_argument("--games", type=int, default=1000)
+    botParser.add_argument("--seed", type=int, default=0)
+    botParser.add_argument("--mistakes", type=float, default=0.1, help="chance of a wrong move before each right one")
+    botParser.add_argument("--record", help="save the games to a move file")
+    botParser.add_argument("--leaderboard", help="save the results of the solved games to a leaderboard database")
+
+    args = parser.parse_args()
+
+    if args.command == "bot" and args.size <= 2:
+        parser.error("size has to be larger than 2")
+
+    if args.command == "replay":
+        replayGames(args.fnames)
+    else:
+        runBotGames(args.size, args.games, args.seed, args.mistakes, args.record, args.leaderboard)
@@ -0,0 +1,76 @@
+# -----------------------------------------------------------------------------
+# Name:        Squared Magic (leaderboard)
+# Purpose:     Keeps every finished Squared Magic game and shows the best times for each grid size
+#
+# Author:      Aritro Saha
+# Created:     19-Oct-2026
+# Updated:     19-Oct-2026
+# -----------------------------------------------------------------------------
+
+import os
+import sqlite3
+import sys
+from time import time
+
+# Results are kept next to the game, no matter where it's run from
+defaultLeaderboardFname = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leaderboard.db")
+
+
+def openLeaderboard(fname=defaultLeaderboardFname):
+    connection = sqlite3.connect(fname)
+
+    # The index is sorted by size then time, so the best times for a size are read straight off the front of it
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS results (
+            gridSize INTEGER NOT NULL,
+            totalTime REAL NOT NULL,
+            moveCount INTEGER NOT NULL,
+            timePerMove REAL NOT NULL,
+            finishedAt REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS resultsBySizeAndTime ON results (gridSize, totalTime, moveCount);
+    """)
+
+    return connection
+
+
+def addResults(connection, results):
+    # results is a list of (gridSize, totalTime, moveCount), all saved in one transaction
+    finishedAt = time()
+
+    with connection:
+        connection.executemany(
+            "INSERT INTO results (gridSize, totalTime, moveCount, timePerMove, finishedAt) VALUES (?, ?, ?, ?, ?)",
+            [(gridSize, totalTime, moveCount, totalTime / max(moveCount, 1), finishedAt)
+             for gridSize, totalTime, moveCount in results])
+
+
+def getTopResults(connection, gridSize, limit=10):
+    # Fastest games first (fewest moves breaks ties), as a list of (totalTime, moveCount, timePerMove, finishedAt)
+    return connection.execute(
+        "SELECT totalTime, moveCount, timePerMove, finishedAt FROM results "
+        "WHERE gridSize = ? ORDER BY totalTime, moveCount LIMIT ?",
+        (gridSize, limit)).fetchall()
+
+
+def printTopResults(connection, gridSize, limit=10):
+    topResults = getTopResults(connection, gridSize, limit)
+
+    if not topResults:
+        print(f"No {str(gridSize)}x{str(gridSize)} games have been finished yet.")
+        return
+
+    print(f"Best times for {str(gridSize)}x{str(gridSize)}:")
+    for place, (totalTime, moveCount, timePerMove, finishedAt) in enumerate(topResults):
+        print(f"{str(place + 1)}. {str(totalTime)}s, {str(moveCount)} move(s)")
+
+
+if __name__ == "__main__":
+    # python leaderboard.py size [how many to show]
+    if len(sys.argv) < 2:
+        print("Usage: python leaderboard.py size [limit]")
+        sys.exit(1)
+
+    leaderboard = openLeaderboard()
+    printTopResults(leaderboard, int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 10)
+    leaderboard.close()
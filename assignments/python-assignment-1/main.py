@@ -7,62 +7,91 @@
 # Updated:     10-Mar-2022
 # -----------------------------------------------------------------------------
 
-from random import randrange
-from math import ceil, floor
+from random import randrange, Random
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager
 from time import time
+from functools import lru_cache
+from heapq import heappush, heappop
+from array import array
+import struct
 
+from leaderboard import openLeaderboard, addResults, printTopResults
 
-def printGrid(myGrid, maxNumLen):
-    # Get length of row so we can print that many dashes
-    rowSepLen = 1
-    for num in myGrid[0]:
-        numStr = str(num)
+try:
+    import numpy as np
+except ImportError:
+    # Magic squares are built with plain lists instead if NumPy isn't installed
+    np = None
 
-        # Calculate how much padding should be on the left of the line
-        gridDisplayPaddingLeft = floor(maxNumLen / 2) - floor(len(numStr) / 2)
+# Grids larger than this are shown through a viewport that can be moved around
+maxViewportSize = 15
 
-        # Calculate how much padding should be on the right of the line
-        gridDisplayPaddingRight = ceil(maxNumLen / 2)
+# Grids larger than this only store the cells that have a number in them
+maxDenseGridSize = 500
 
-        # Add this length to the total length
-        rowSepLen += gridDisplayPaddingLeft + \
-            gridDisplayPaddingRight + len(numStr)
+# Saved games start with this header (file type, version, grid size, start x, y, and number, moves, journal length and position),
+# followed by a (cell, number) pair for every move in the journal
+journalHeader = struct.Struct("<4sBIIIQQQQ")
+journalFileType = b"SQMJ"
 
-    # Actually print out the grid
-    for row in myGrid:
-        # Print row separators
-        print('—' * rowSepLen)
 
-        for num in row:
-            numStr = ""
+def formatCell(num, cellPaddings):
+    # Don't print anything if it's 0
+    if num == 0:
+        numStr = "-"
+    elif num < 0:
+        # Something is very wrong, as there should never be any negative numbers at all
+        print(
+            "Sorry, but an unexpected error occured. Please try running the program again.")
+        exit()
+    else:
+        numStr = str(num)
 
-            # Don't print anything if it's 0
-            if num == 0:
-                numStr = "-"
-            elif num < 0:
-                # Something is very wrong, as there should never be any negative numbers at all
-                print(
-                    "Sorry, but an unexpected error occured. Please try running the program again.")
-                exit()
-            else:
-                numStr = str(num)
+    # The padding and divider only depend on how long the number is
+    return numStr + cellPaddings[len(numStr)]
 
-            # Spacing for the left side of the line
-            gridDisplayPaddingLeft = ' ' * \
-                (floor(maxNumLen / 2) - floor(len(numStr) / 2))
 
-            # Spacing for the right side of the line
-            gridDisplayPaddingRight = ' ' * ceil(maxNumLen / 2)
+def printGrid(gameState, maxNumLen, viewport=None):
+    gridSize = gameState["gridSize"]
 
-            # Display the grid
-            print(
-                f"{numStr}{gridDisplayPaddingLeft}|{gridDisplayPaddingRight}", end='')
+    # Only show the part of the grid inside the viewport (top left x, top left y, size) if there is one
+    viewX, viewY, viewSize = viewport if viewport else (0, 0, gridSize)
+    viewEndX = min(viewX + viewSize, gridSize)
+    viewEndY = min(viewY + viewSize, gridSize)
 
-        # Add new line for new row
-        print()
+    # Start over if the columns shown changed, otherwise rows that haven't changed since last time are reused
+    renderCache = gameState["renderCache"]
+    if renderCache["columns"] != (viewX, viewEndX, maxNumLen):
+        renderCache["columns"] = (viewX, viewEndX, maxNumLen)
+        renderCache["rows"] = {}
+
+        # Padding on the left and right of the divider for every possible number length
+        renderCache["cellPaddings"] = [
+            ' ' * (maxNumLen // 2 - numLen // 2) + '|' + ' ' * -(-maxNumLen // 2)
+            for numLen in range(maxNumLen + 1)
+        ]
+
+    renderedRows = renderCache["rows"]
+    for rowIdx in range(viewY, viewEndY):
+        if rowIdx not in renderedRows:
+            renderedRows[rowIdx] = ''.join([formatCell(num, renderCache["cellPaddings"])
+                                            for num in getRow(gameState, rowIdx, viewX, viewEndX)])
+
+    # Get length of row so we can print that many dashes (every cell is its number, its padding, and one divider)
+    rowSep = '—' * (len(renderedRows[viewY]) - (viewEndX - viewX) + 1)
 
-    # Add final divider
-    print('—' * rowSepLen)
+    # Write the whole frame at once
+    frame = [rowSep]
+    for rowIdx in range(viewY, viewEndY):
+        frame.append(renderedRows[rowIdx])
+        frame.append(rowSep)
+    frame.append("")
+
+    sys.stdout.write("\n".join(frame))
 
 
 def checkGrid(myGrid, magicConst):
@@ -85,15 +114,1058 @@ def checkGrid(myGrid, magicConst):
     return gridCompleted
 
 
-# Instruction screen
-print("""
+def createArrayGrid(magicSquareSize):
+    # 8 bytes a cell instead of a Python int each, and every row or column can be added up at once
+    return np.zeros((magicSquareSize, magicSquareSize), dtype=np.int64)
+
+
+def isArrayGrid(myGrid):
+    return np is not None and isinstance(myGrid, np.ndarray)
+
+
+def checkGridArray(myGrid, magicConst):
+    # Same as checkGrid for a grid from createArrayGrid
+    return bool((myGrid.sum(axis=1) == magicConst).all() and (myGrid.sum(axis=0) == magicConst).all())
+
+
+def getUnsatisfiedLines(myGrid, magicConst):
+    # The rows (y) and columns (x) that don't add up to the magic constant yet, counting from 1 like moves do
+    return (np.flatnonzero(myGrid.sum(axis=1) != magicConst) + 1,
+            np.flatnonzero(myGrid.sum(axis=0) != magicConst) + 1)
+
+
+def createSparseGrid():
+    # Only the cells with a number in them are stored, as {(x, y): number}
+    return {}
+
+
+def isSparseGrid(myGrid):
+    return isinstance(myGrid, dict)
+
+
+def createGameState(myGrid, magicConst, startPos=None, gridSize=None):
+    # A sparse grid doesn't know its own size, so it has to be given
+    gridSize = len(myGrid) if gridSize is None else gridSize
+
+    # Work out the row and column sums and how many cells are filled in each once, after that setCell keeps them up to date
+    if isArrayGrid(myGrid):
+        rowSums = myGrid.sum(axis=1)
+        colSums = myGrid.sum(axis=0)
+        rowFillCounts = np.count_nonzero(myGrid, axis=1)
+        colFillCounts = np.count_nonzero(myGrid, axis=0)
+        satisfiedLines = int(np.count_nonzero(rowSums == magicConst) + np.count_nonzero(colSums == magicConst))
+        usedNumbers = set(myGrid[myGrid != 0].tolist())
+    else:
+        if isSparseGrid(myGrid):
+            rowSums = [0] * gridSize
+            colSums = [0] * gridSize
+            rowFillCounts = [0] * gridSize
+            colFillCounts = [0] * gridSize
+
+            for (posX, posY), num in myGrid.items():
+                rowSums[posY] += num
+                colSums[posX] += num
+                rowFillCounts[posY] += 1
+                colFillCounts[posX] += 1
+
+            usedNumbers = set(myGrid.values())
+        else:
+            rowSums = [sum(row) for row in myGrid]
+            colSums = [sum(myGrid[rowIdx][colIdx] for rowIdx in range(gridSize))
+                       for colIdx in range(gridSize)]
+            rowFillCounts = [sum(1 for num in row if num != 0) for row in myGrid]
+            colFillCounts = [sum(1 for rowIdx in range(gridSize) if myGrid[rowIdx][colIdx] != 0)
+                             for colIdx in range(gridSize)]
+            usedNumbers = {num for row in myGrid for num in row if num != 0}
+
+        satisfiedLines = rowSums.count(magicConst) + colSums.count(magicConst)
+
+    gameState = {
+        "grid": myGrid,
+        "gridSize": gridSize,
+        "magicConstant": magicConst,
+        # The cell (0-based x, y) that can't be changed
+        "startPos": startPos,
+        "rowSums": rowSums,
+        "colSums": colSums,
+        "rowFillCounts": rowFillCounts,
+        "colFillCounts": colFillCounts,
+        # Number of rows and columns that currently add up to the magic constant
+        "satisfiedLines": satisfiedLines,
+        # Numbers currently in the grid, so only the numbers actually placed take up memory
+        "usedNumbers": usedNumbers,
+        # Every number below nextLowNumber that's free is in freedLowNumbers, so the lowest free number can be found
+        # without sorting everything that's used
+        "nextLowNumber": 1,
+        "freedLowNumbers": [],
+        # Lines (("row" or "column", index)) that can't add up to the magic constant anymore
+        "deadLines": set(),
+        # Lines with 2 or more empty cells, split by whether the lowest free number is too big for them, as (negated number
+        # still needed, line) and (number still needed, line). Only the lines the lowest free number moves past are checked again.
+        "linesBelowLowest": [],
+        "linesAboveLowest": [],
+        # The number each line with one empty cell left needs, and the lines waiting on each number
+        "lineNeeds": {},
+        "linesNeeding": {},
+        # Rows already formatted by printGrid
+        "renderCache": {"columns": None, "rows": {}, "cellPaddings": []},
+        # Every move as (x, y, old number, new number), and how many of them are currently applied (the rest can be redone)
+        "journal": [],
+        "journalPosition": 0,
+        "moveCount": 0
+    }
+
+    for lineIdx in range(gridSize):
+        updateLineFeasibility(gameState, ("row", lineIdx))
+        updateLineFeasibility(gameState, ("column", lineIdx))
+
+    return gameState
+
+
+def freeNumber(gameState, number):
+    # Numbers the lowest search has already gone past have to be remembered once they're free again
+    if number < gameState["nextLowNumber"]:
+        heappush(gameState["freedLowNumbers"], number)
+
+
+def getLowestUnusedNumber(gameState):
+    # Numbers freed earlier might have been used again since, those are only thrown out once they reach the top
+    usedNumbers = gameState["usedNumbers"]
+    freedLowNumbers = gameState["freedLowNumbers"]
+    while freedLowNumbers and freedLowNumbers[0] in usedNumbers:
+        heappop(freedLowNumbers)
+
+    # nextLowNumber only ever goes up, so it passes every number at most once
+    while gameState["nextLowNumber"] in usedNumbers:
+        gameState["nextLowNumber"] += 1
+
+    return min(freedLowNumbers[0], gameState["nextLowNumber"]) if freedLowNumbers else gameState["nextLowNumber"]
+
+
+def getLineTotals(gameState, line):
+    # The sum of a line and how many of its cells are empty
+    lineType, lineIdx = line
+    if lineType == "row":
+        lineSum, fillCount = gameState["rowSums"][lineIdx], gameState["rowFillCounts"][lineIdx]
+    else:
+        lineSum, fillCount = gameState["colSums"][lineIdx], gameState["colFillCounts"][lineIdx]
+
+    return int(lineSum), gameState["gridSize"] - int(fillCount)
+
+
+def isLineFeasible(gameState, lineSum, emptyCells):
+    # Whether the empty cells of a line could still bring lineSum up to the magic constant. Empty cells can stay empty in a
+    # solved grid, so a line that already adds up is always fine.
+    magicConst = gameState["magicConstant"]
+    remaining = magicConst - lineSum
+
+    if remaining == 0:
+        return True
+    if emptyCells == 0 or remaining < 0:
+        return False
+    if emptyCells == 1:
+        return remaining < magicConst and remaining not in gameState["usedNumbers"]
+
+    # Filling only some of the empty cells is allowed too, so anything from the lowest free number up could still be reached
+    return remaining >= getLowestUnusedNumber(gameState)
+
+
+def updateLineFeasibility(gameState, line):
+    lineSum, emptyCells = getLineTotals(gameState, line)
+    remaining = gameState["magicConstant"] - lineSum
+
+    # Lines with one empty cell are checked again whenever the number they need is used or freed
+    oldNeed = gameState["lineNeeds"].pop(line, None)
+    if oldNeed is not None:
+        gameState["linesNeeding"][oldNeed].discard(line)
+        if not gameState["linesNeeding"][oldNeed]:
+            del gameState["linesNeeding"][oldNeed]
+
+    if emptyCells == 1:
+        gameState["lineNeeds"][line] = remaining
+        gameState["linesNeeding"].setdefault(remaining, set()).add(line)
+
+    isFeasible = isLineFeasible(gameState, lineSum, emptyCells)
+    if isFeasible:
+        gameState["deadLines"].discard(line)
+    else:
+        gameState["deadLines"].add(line)
+
+    # Lines with more empty cells are checked again once the lowest free number passes what they still need.
+    # Older entries for the same line are left in the heaps and skipped once they come up.
+    if emptyCells >= 2 and remaining > 0:
+        if isFeasible:
+            heappush(gameState["linesAboveLowest"], (remaining, line))
+        else:
+            heappush(gameState["linesBelowLowest"], (-remaining, line))
+
+
+def isLineEntryCurrent(gameState, remaining, line):
+    # Whether a heap entry still matches the line, since the line could have changed after it was added
+    lineSum, emptyCells = getLineTotals(gameState, line)
+    return emptyCells >= 2 and gameState["magicConstant"] - lineSum == remaining
+
+
+def updateLowestNumberLines(gameState):
+    # Only lines needing less than the lowest free number are dead, so when it moves only the lines it moved past change
+    lowest = getLowestUnusedNumber(gameState)
+
+    linesBelowLowest = gameState["linesBelowLowest"]
+    while linesBelowLowest and -linesBelowLowest[0][0] >= lowest:
+        negatedRemaining, line = heappop(linesBelowLowest)
+        if isLineEntryCurrent(gameState, -negatedRemaining, line):
+            updateLineFeasibility(gameState, line)
+
+    linesAboveLowest = gameState["linesAboveLowest"]
+    while linesAboveLowest and linesAboveLowest[0][0] < lowest:
+        remaining, line = heappop(linesAboveLowest)
+        if isLineEntryCurrent(gameState, remaining, line):
+            updateLineFeasibility(gameState, line)
+
+
+def getDeadLineMessage(gameState):
+    # Tells the player which lines can't be finished anymore, or returns None if every line still can be
+    if not gameState["deadLines"]:
+        return None
+
+    lineNames = [f"{lineType} {str(lineIdx + 1)}" for lineType, lineIdx in sorted(gameState["deadLines"], key=lambda line: (line[1], line[0]))]
+    return f"Careful, {', '.join(lineNames)} can't add up to {str(gameState['magicConstant'])} anymore."
+
+
+def getCell(gameState, posX, posY):
+    if isSparseGrid(gameState["grid"]):
+        return gameState["grid"].get((posX, posY), 0)
+
+    return int(gameState["grid"][posY][posX])
+
+
+def getRow(gameState, rowIdx, startX, endX):
+    # The numbers in row rowIdx from column startX up to (not including) endX
+    myGrid = gameState["grid"]
+    if isSparseGrid(myGrid):
+        return [myGrid.get((posX, rowIdx), 0) for posX in range(startX, endX)]
+
+    return myGrid[rowIdx][startX:endX]
+
+
+def setCell(gameState, posX, posY, newNumber):
+    magicConst = gameState["magicConstant"]
+    oldNumber = getCell(gameState, posX, posY)
+    difference = newNumber - oldNumber
+
+    # Keep track of how many cells are filled in this row and column
+    if (oldNumber == 0) != (newNumber == 0):
+        fillDifference = 1 if oldNumber == 0 else -1
+        gameState["rowFillCounts"][posY] += fillDifference
+        gameState["colFillCounts"][posX] += fillDifference
+
+    # Only the row and column of this cell change, so update their sums and whether they're satisfied
+    for lineSums, lineIdx in ((gameState["rowSums"], posY), (gameState["colSums"], posX)):
+        if lineSums[lineIdx] == magicConst:
+            gameState["satisfiedLines"] -= 1
+
+        lineSums[lineIdx] += difference
+
+        if lineSums[lineIdx] == magicConst:
+            gameState["satisfiedLines"] += 1
+
+    # The old number can be used again, and the new one can't
+    if oldNumber != 0:
+        gameState["usedNumbers"].discard(oldNumber)
+        freeNumber(gameState, oldNumber)
+    if newNumber != 0:
+        gameState["usedNumbers"].add(newNumber)
+
+    # Only this row and column, and the lines waiting on either number, can become possible or impossible to finish
+    updateLineFeasibility(gameState, ("row", posY))
+    updateLineFeasibility(gameState, ("column", posX))
+    for number in (oldNumber, newNumber):
+        for line in list(gameState["linesNeeding"].get(number, ())):
+            updateLineFeasibility(gameState, line)
+
+    # The lowest free number might have moved, which only matters to the lines it moved past
+    updateLowestNumberLines(gameState)
+
+    if isSparseGrid(gameState["grid"]):
+        if newNumber == 0:
+            gameState["grid"].pop((posX, posY), None)
+        else:
+            gameState["grid"][(posX, posY)] = newNumber
+    else:
+        gameState["grid"][posY][posX] = newNumber
+
+    # This row has to be formatted again next time it's shown
+    gameState["renderCache"]["rows"].pop(posY, None)
+
+
+def applyMoves(gameState, moves):
+    # Make a batch of moves on a grid from createArrayGrid, where every move is (x, y, number) with x and y counting from 1
+    # and 0 removing the number. Nothing is changed if any of the moves aren't allowed.
+    myGrid = gameState["grid"]
+    gridSize = gameState["gridSize"]
+    magicConst = gameState["magicConstant"]
+
+    moves = np.asarray(moves, dtype=np.int64).reshape(-1, 3)
+    posXs = moves[:, 0] - 1
+    posYs = moves[:, 1] - 1
+    newNumbers = moves[:, 2]
+
+    if not ((posXs >= 0) & (posXs < gridSize) & (posYs >= 0) & (posYs < gridSize)).all():
+        raise ValueError("The given position falls outside the grid")
+
+    startPos = gameState["startPos"]
+    if startPos is not None and ((posXs == startPos[0]) & (posYs == startPos[1])).any():
+        raise ValueError("You cannot replace the starting number")
+
+    if not ((newNumbers >= 0) & (newNumbers < magicConst)).all():
+        raise ValueError("Numbers must be below the magic constant, and can't be negative")
+
+    if np.unique(posYs * gridSize + posXs).size != len(moves):
+        raise ValueError("Each position can only be changed once per batch")
+
+    # Numbers in the positions being changed are free to be used again
+    oldNumbers = myGrid[posYs, posXs]
+    placedNumbers = newNumbers[newNumbers != 0]
+    freedNumbers = set(oldNumbers.tolist())
+    if np.unique(placedNumbers).size != placedNumbers.size or \
+            any(num in gameState["usedNumbers"] and num not in freedNumbers for num in placedNumbers.tolist()):
+        raise ValueError("That number has already been used")
+
+    myGrid[posYs, posXs] = newNumbers
+
+    # Update the sums of every row and column touched
+    differences = newNumbers - oldNumbers
+    np.add.at(gameState["rowSums"], posYs, differences)
+    np.add.at(gameState["colSums"], posXs, differences)
+    fillDifferences = (newNumbers != 0).astype(np.int64) - (oldNumbers != 0)
+    np.add.at(gameState["rowFillCounts"], posYs, fillDifferences)
+    np.add.at(gameState["colFillCounts"], posXs, fillDifferences)
+    gameState["satisfiedLines"] = int(np.count_nonzero(gameState["rowSums"] == magicConst) +
+                                      np.count_nonzero(gameState["colSums"] == magicConst))
+
+    gameState["usedNumbers"].difference_update(freedNumbers)
+    gameState["usedNumbers"].update(placedNumbers.tolist())
+    gameState["usedNumbers"].discard(0)
+    for number in freedNumbers:
+        if number != 0:
+            freeNumber(gameState, number)
+
+    # Check every line touched, and every line waiting on a number that was freed or placed
+    changedLines = {("row", rowIdx) for rowIdx in np.unique(posYs).tolist()} | \
+                   {("column", colIdx) for colIdx in np.unique(posXs).tolist()}
+    for number in freedNumbers | set(placedNumbers.tolist()):
+        changedLines.update(gameState["linesNeeding"].get(number, ()))
+    for line in changedLines:
+        updateLineFeasibility(gameState, line)
+    updateLowestNumberLines(gameState)
+
+    for rowIdx in np.unique(posYs).tolist():
+        gameState["renderCache"]["rows"].pop(rowIdx, None)
+
+    # Undoing part of a batch could put a number back in two places, so batches start a fresh journal
+    gameState["journal"].clear()
+    gameState["journalPosition"] = 0
+
+
+def moveViewport(viewport, gridSize, viewX, viewY):
+    # Keep the whole viewport inside the grid
+    viewport[0] = max(0, min(viewX, gridSize - viewport[2]))
+    viewport[1] = max(0, min(viewY, gridSize - viewport[2]))
+
+
+def isGridSolved(gameState):
+    # Same result as checkGrid, but without going through the whole grid
+    return gameState["satisfiedLines"] == 2 * gameState["gridSize"]
+
+
+def buildOddMagicSquare(squareSize):
+    # Closed form of the Siamese method (start in the middle of the top row, move up and right)
+    return [[squareSize * ((rowIdx + colIdx + squareSize // 2 + 1) % squareSize) + (rowIdx + 2 * colIdx + 1) % squareSize + 1
+             for colIdx in range(squareSize)]
+            for rowIdx in range(squareSize)]
+
+
+def buildDoublyEvenMagicSquare(squareSize):
+    # Count up from 1, but flip the cells on the diagonals of every 4x4 block to the other end
+    return [[squareSize ** 2 - (rowIdx * squareSize + colIdx)
+             if (rowIdx % 4 in (0, 3)) == (colIdx % 4 in (0, 3))
+             else rowIdx * squareSize + colIdx + 1
+             for colIdx in range(squareSize)]
+            for rowIdx in range(squareSize)]
+
+
+def buildSinglyEvenMagicSquare(squareSize):
+    # Conway's LUX method, where every number of an odd magic square half the size becomes a 2x2 block
+    halfSize = squareSize // 2
+    lRowCount = (squareSize - 2) // 4 + 1
+    halfSquare = buildOddMagicSquare(halfSize)
+    luxPatterns = {
+        "L": ((4, 1), (2, 3)),
+        "U": ((1, 4), (2, 3)),
+        "X": ((1, 4), (3, 2))
+    }
+
+    square = [[0 for x in range(squareSize)] for y in range(squareSize)]
+    for rowIdx in range(halfSize):
+        for colIdx in range(halfSize):
+            # Rows of L, then one row of U, then X for the rest, with the middle L and U swapped
+            if rowIdx < lRowCount:
+                letter = "L"
+            elif rowIdx == lRowCount:
+                letter = "U"
+            else:
+                letter = "X"
+
+            if colIdx == halfSize // 2 and rowIdx == lRowCount - 1:
+                letter = "U"
+            elif colIdx == halfSize // 2 and rowIdx == lRowCount:
+                letter = "L"
+
+            baseNum = 4 * (halfSquare[rowIdx][colIdx] - 1)
+            for blockRow in range(2):
+                for blockCol in range(2):
+                    square[2 * rowIdx + blockRow][2 * colIdx + blockCol] = \
+                        baseNum + luxPatterns[letter][blockRow][blockCol]
+
+    return square
+
+
+def buildOddMagicSquareArray(squareSize):
+    # Same formula as buildOddMagicSquare, worked out for every cell at once
+    rowIdx, colIdx = np.indices((squareSize, squareSize), dtype=np.int64)
+    return squareSize * ((rowIdx + colIdx + squareSize // 2 + 1) % squareSize) + (rowIdx + 2 * colIdx + 1) % squareSize + 1
+
+
+def buildDoublyEvenMagicSquareArray(squareSize):
+    rowIdx, colIdx = np.indices((squareSize, squareSize), dtype=np.int64)
+    flipped = ((rowIdx % 4 == 0) | (rowIdx % 4 == 3)) == ((colIdx % 4 == 0) | (colIdx % 4 == 3))
+    countUp = rowIdx * squareSize + colIdx
+    return np.where(flipped, squareSize ** 2 - countUp, countUp + 1)
+
+
+def buildSinglyEvenMagicSquareArray(squareSize):
+    halfSize = squareSize // 2
+    lRowCount = (squareSize - 2) // 4 + 1
+    halfSquare = buildOddMagicSquareArray(halfSize)
+
+    # L, U, and X are 0, 1, and 2, laid out the same way as in buildSinglyEvenMagicSquare
+    letterRows = np.arange(halfSize)
+    letters = np.repeat(np.where(letterRows < lRowCount, 0, np.where(
+        letterRows == lRowCount, 1, 2))[:, None], halfSize, axis=1)
+    letters[lRowCount - 1, halfSize // 2] = 1
+    letters[lRowCount, halfSize // 2] = 0
+    luxPatterns = np.array([[[4, 1], [2, 3]], [[1, 4], [2, 3]], [[1, 4], [3, 2]]], dtype=np.int64)
+
+    # Turn every number into its 2x2 block, then lay the blocks out side by side
+    blocks = 4 * (halfSquare - 1)[:, :, None, None] + luxPatterns[letters]
+    return blocks.transpose(0, 2, 1, 3).reshape(squareSize, squareSize)
+
+
+@lru_cache(maxsize=8)
+def getMagicSquare(squareSize):
+    # Uses every number from 1 to squareSize^2 once (kept read only since it's shared between callers)
+    if np is None:
+        if squareSize % 2 == 1:
+            square = buildOddMagicSquare(squareSize)
+        elif squareSize % 4 == 0:
+            square = buildDoublyEvenMagicSquare(squareSize)
+        else:
+            square = buildSinglyEvenMagicSquare(squareSize)
+
+        return tuple(tuple(row) for row in square)
+
+    if squareSize % 2 == 1:
+        square = buildOddMagicSquareArray(squareSize)
+    elif squareSize % 4 == 0:
+        square = buildDoublyEvenMagicSquareArray(squareSize)
+    else:
+        square = buildSinglyEvenMagicSquareArray(squareSize)
+
+    square.flags.writeable = False
+    return square
+
+
+@lru_cache(maxsize=8)
+def getMagicSquarePositions(squareSize):
+    # Where each number is in getMagicSquare, so positions[num - 1] is its index in the flattened square
+    square = getMagicSquare(squareSize)
+    if np is None:
+        positions = [0] * squareSize ** 2
+        for cellIdx, num in enumerate(num for row in square for num in row):
+            positions[num - 1] = cellIdx
+        return tuple(positions)
+
+    positions = np.empty(squareSize ** 2, dtype=np.int64)
+    positions[square.ravel() - 1] = np.arange(squareSize ** 2)
+    positions.flags.writeable = False
+    return positions
+
+
+def buildMagicSquare(squareSize):
+    # A copy of the cached magic square that can be changed
+    square = getMagicSquare(squareSize)
+    return square.tolist() if np is not None else [list(row) for row in square]
+
+
+def moveCellTo(myGrid, fromPos, toPos):
+    # Swapping whole rows and columns doesn't change any row or column sums
+    myGrid[fromPos[1]], myGrid[toPos[1]] = myGrid[toPos[1]], myGrid[fromPos[1]]
+    for row in myGrid:
+        row[fromPos[0]], row[toPos[0]] = row[toPos[0]], row[fromPos[0]]
+
+
+def getOrthogonalLatinSquares(blockSize):
+    # Two Latin squares where every pair of symbols shows up exactly once (only used for sizes 3, 4, and 5)
+    if blockSize == 4:
+        # Addition and multiplication by 2 in the field with 4 elements
+        timesTwo = [0, 2, 3, 1]
+        return ([[rowIdx ^ colIdx for colIdx in range(4)] for rowIdx in range(4)],
+                [[rowIdx ^ timesTwo[colIdx] for colIdx in range(4)] for rowIdx in range(4)])
+
+    return ([[(rowIdx + colIdx) % blockSize for colIdx in range(blockSize)] for rowIdx in range(blockSize)],
+            [[(rowIdx + 2 * colIdx) % blockSize for colIdx in range(blockSize)] for rowIdx in range(blockSize)])
+
+
+def isOffsetFree(offset, offsets, blockSize, usedNumbers, magicConst):
+    # An offset takes up the numbers offset to offset + blockSize - 1
+    if offset < 1 or offset + blockSize > magicConst:
+        return False
+
+    if any(abs(offset - otherOffset) < blockSize for otherOffset in offsets):
+        return False
+
+    return not any(offset + i in usedNumbers for i in range(blockSize))
+
+
+def pickBlockOffsets(offsets, blockSize, offsetTotal, usedNumbers, magicConst, rng=None):
+    offsets = offsets[:]
+
+    # Look for offsets near the average first, moving outwards from it (or from somewhere close to it, if there's an rng)
+    def nearbyOffsets(centre):
+        if rng is not None:
+            centre += rng.randint(-2, 2) * blockSize
+        yield centre
+        for step in range(1, 4 * magicConst // blockSize + 1):
+            yield centre + step * blockSize
+            yield centre - step * blockSize
+
+    # Pick all but the last two offsets wherever there's room
+    while len(offsets) < blockSize - 2:
+        centre = (offsetTotal - sum(offsets)) // (blockSize - len(offsets))
+        for offset in nearbyOffsets(centre):
+            if isOffsetFree(offset, offsets, blockSize, usedNumbers, magicConst):
+                offsets.append(offset)
+                break
+        else:
+            return None
+
+    # The last two have to make up the rest of the total exactly
+    pairTotal = offsetTotal - sum(offsets)
+    for offset in nearbyOffsets(pairTotal // 2):
+        lastOffset = pairTotal - offset
+        if isOffsetFree(offset, offsets, blockSize, usedNumbers, magicConst) and \
+                isOffsetFree(lastOffset, offsets + [offset], blockSize, usedNumbers, magicConst):
+            return offsets + [offset, lastOffset]
+
+    return None
+
+
+def buildBlockGrid(magicSquareSize, startPos, startNum, seed=0):
+    magicConst = magicSquareSize * (magicSquareSize ** 2 + 1) // 2
+
+    # Split the grid into blocks of size 3, 4, and 5 along the diagonal, everything else stays empty
+    blockSizes = {0: [], 1: [4], 2: [5]}[magicSquareSize % 3]
+    blockSizes += [3] * ((magicSquareSize - sum(blockSizes)) // 3)
+
+    # Other seeds put the blocks in another order and look for their offsets in other places, so they give other grids
+    rng = None
+    if seed != 0:
+        rng = Random(seed)
+        rng.shuffle(blockSizes)
+
+    myGrid = [[0 for x in range(magicSquareSize)]
+              for y in range(magicSquareSize)]
+    usedNumbers = set()
+    blockStart = 0
+
+    for blockIdx, blockSize in enumerate(blockSizes):
+        # Every cell is offsets[symbol 1] + symbol 2, so each row and column adds up to sum(offsets) + 0 + 1 + ... + (blockSize - 1)
+        firstSymbols, secondSymbols = getOrthogonalLatinSquares(blockSize)
+        offsetTotal = magicConst - blockSize * (blockSize - 1) // 2
+
+        # The starting number goes in the top left of the first block, where both symbols are 0
+        offsets = pickBlockOffsets([startNum] if blockIdx == 0 else [],
+                                   blockSize, offsetTotal, usedNumbers, magicConst, rng)
+        if offsets is None:
+            return None
+
+        for offset in offsets:
+            usedNumbers.update(range(offset, offset + blockSize))
+
+        for rowIdx in range(blockSize):
+            for colIdx in range(blockSize):
+                myGrid[blockStart + rowIdx][blockStart + colIdx] = \
+                    offsets[firstSymbols[rowIdx][colIdx]] + secondSymbols[rowIdx][colIdx]
+
+        blockStart += blockSize
+
+    moveCellTo(myGrid, (0, 0), startPos)
+    return myGrid
+
+
+def searchGrid(magicSquareSize, startPos, startNum, seed=0, nodeLimit=200000, cellOrder="rows", stopEvent=None):
+    magicConst = magicSquareSize * (magicSquareSize ** 2 + 1) // 2
+    rng = Random(seed)
+
+    myGrid = [[0 for x in range(magicSquareSize)]
+              for y in range(magicSquareSize)]
+    myGrid[startPos[1]][startPos[0]] = startNum
+
+    # How much each row and column still needs, and how many cells are left to decide in each
+    rowRemaining = [magicConst] * magicSquareSize
+    colRemaining = [magicConst] * magicSquareSize
+    rowCellsLeft = [magicSquareSize] * magicSquareSize
+    colCellsLeft = [magicSquareSize] * magicSquareSize
+    rowRemaining[startPos[1]] -= startNum
+    colRemaining[startPos[0]] -= startNum
+    rowCellsLeft[startPos[1]] -= 1
+    colCellsLeft[startPos[0]] -= 1
+
+    # Bit i is set if the number i has been used
+    searchState = {"usedBits": 1 << startNum, "nodes": 0}
+    cells = [(x, y) for y in range(magicSquareSize) for x in range(magicSquareSize)
+             if (x, y) != startPos]
+
+    # Different orders get stuck in different places, which is what the portfolio solver relies on
+    if cellOrder == "columns":
+        cells.sort()
+    elif cellOrder == "shuffled":
+        rng.shuffle(cells)
+
+    def isNumberAvailable(num):
+        return num == 0 or (0 < num < magicConst and not searchState["usedBits"] >> num & 1)
+
+    def getCandidates(posX, posY):
+        # The last cell in a row or column has to be exactly what's left
+        if rowCellsLeft[posY] == 1 or colCellsLeft[posX] == 1:
+            if rowCellsLeft[posY] == 1 and colCellsLeft[posX] == 1 and rowRemaining[posY] != colRemaining[posX]:
+                return []
+
+            forcedNum = rowRemaining[posY] if rowCellsLeft[posY] == 1 else colRemaining[posX]
+            return [forcedNum] if isNumberAvailable(forcedNum) else []
+
+        # Otherwise try leaving it empty, finishing off the row or column, or some other number that still fits
+        maxNum = min(rowRemaining[posY], colRemaining[posX], magicConst - 1)
+        candidates = {0}
+        for num in (rowRemaining[posY], colRemaining[posX]):
+            if num <= maxNum:
+                candidates.add(num)
+        if maxNum >= 1:
+            candidates.update(rng.randint(1, maxNum) for i in range(6))
+
+        candidates = [num for num in candidates if isNumberAvailable(num)]
+        rng.shuffle(candidates)
+        return candidates
+
+    def placeNumber(posX, posY, num, direction):
+        myGrid[posY][posX] = num if direction == 1 else 0
+        rowRemaining[posY] -= direction * num
+        colRemaining[posX] -= direction * num
+        rowCellsLeft[posY] -= direction
+        colCellsLeft[posX] -= direction
+        if num != 0:
+            searchState["usedBits"] ^= 1 << num
+
+    def canStillFinish(posX, posY):
+        # If only one cell is left in the row or column, the number it needs has to still be available
+        for cellsLeft, remaining in ((rowCellsLeft[posY], rowRemaining[posY]), (colCellsLeft[posX], colRemaining[posX])):
+            if cellsLeft == 0 and remaining != 0:
+                return False
+            if cellsLeft == 1 and not isNumberAvailable(remaining):
+                return False
+        return True
+
+    def search():
+        # The candidates still to try in every cell decided so far, and the number placed in each of them. Keeping them in
+        # lists instead of recursing means large grids don't run out of stack.
+        if not cells:
+            return True
+        candidateStack = [getCandidates(*cells[0])[::-1]]
+        placedNumbers = []
+
+        while candidateStack:
+            cellIdx = len(candidateStack) - 1
+            posX, posY = cells[cellIdx]
+
+            # Take back the last number tried in this cell before trying the next one
+            if len(placedNumbers) > cellIdx:
+                placeNumber(posX, posY, placedNumbers.pop(), -1)
+
+            if not candidateStack[-1]:
+                candidateStack.pop()
+                continue
+
+            num = candidateStack[-1].pop()
+            placeNumber(posX, posY, num, 1)
+            placedNumbers.append(num)
+            if not canStillFinish(posX, posY):
+                continue
+            if cellIdx + 1 == len(cells):
+                return True
+
+            searchState["nodes"] += 1
+            if searchState["nodes"] > nodeLimit:
+                return False
+
+            # Give up if another search already found a solution (only checked now and then since it's slow)
+            if stopEvent is not None and searchState["nodes"] % 4096 == 0 and stopEvent.is_set():
+                return False
+
+            candidateStack.append(getCandidates(*cells[cellIdx + 1])[::-1])
+
+        return False
+
+    return myGrid if search() else None
+
+
+def solveGrid(magicSquareSize, startPos, startNum, seed=0):
+    # Returns a grid where every row and column adds up to the magic constant, or None if no solution was found
+    if startNum <= magicSquareSize ** 2:
+        # Since all the numbers would have to be used, a normal magic square works with its rows and columns moved around
+        square = buildMagicSquare(magicSquareSize)
+        startIdx = int(getMagicSquarePositions(magicSquareSize)[startNum - 1])
+        moveCellTo(square, (startIdx % magicSquareSize, startIdx // magicSquareSize), startPos)
+        return square
+
+    # A full grid would add up to more than n rows of the magic constant, so some cells have to be left empty
+    myGrid = buildBlockGrid(magicSquareSize, startPos, startNum)
+    if myGrid is None:
+        myGrid = searchGrid(magicSquareSize, startPos, startNum, seed)
+
+    return myGrid
+
+
+def solveWithStrategy(magicSquareSize, startPos, startNum, strategy, nodeLimit, stopEvent):
+    # Strategy 0 is the normal solver. The others build blocks in their own order and places first, and only search
+    # (with their own seed and cell order) if that doesn't work.
+    if strategy == 0:
+        return solveGrid(magicSquareSize, startPos, startNum)
+
+    myGrid = buildBlockGrid(magicSquareSize, startPos, startNum, strategy)
+    if myGrid is None:
+        cellOrder = ["rows", "columns", "shuffled"][strategy % 3]
+        myGrid = searchGrid(magicSquareSize, startPos, startNum, strategy,
+                            nodeLimit, cellOrder, stopEvent)
+
+    return myGrid
+
+
+def solveGridPortfolio(magicSquareSize, startPos, startNum, strategyCount=None, nodeLimit=2000000):
+    magicConst = magicSquareSize * (magicSquareSize ** 2 + 1) // 2
+    strategyCount = strategyCount or os.cpu_count() or 1
+
+    # Run a different strategy on every core and keep whichever one finishes first
+    with Manager() as manager:
+        stopEvent = manager.Event()
+        executor = ProcessPoolExecutor(max_workers=strategyCount)
+
+        try:
+            futures = [executor.submit(solveWithStrategy, magicSquareSize, startPos, startNum,
+                                       strategy, nodeLimit, stopEvent)
+                       for strategy in range(strategyCount)]
+
+            for future in as_completed(futures):
+                # A strategy that crashed is skipped, the others might still find a grid
+                try:
+                    myGrid = future.result()
+                except Exception:
+                    continue
+
+                if myGrid is not None and checkGrid(myGrid, magicConst) and \
+                        myGrid[startPos[1]][startPos[0]] == startNum:
+                    return myGrid
+        finally:
+            # Tell the other searches to stop, without waiting for them to notice
+            stopEvent.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return None
+
+
+def createGame(magicSquareSize, startPos=None, startNum=None, randomGenerator=None, sparse=None):
+    # Sets up a puzzle (a random one unless the start is given) and returns its game state and a solution for it.
+    # Sparse grids are used for huge sizes unless told otherwise, and don't come with a solution since it would fill every cell.
+    rand = randomGenerator.randrange if randomGenerator else randrange
+    if sparse is None:
+        sparse = magicSquareSize > maxDenseGridSize
+
+    # Generate the grid (large ones are kept in a NumPy array if it's installed)
+    if sparse:
+        grid = createSparseGrid()
+    elif np is not None and magicSquareSize > maxViewportSize:
+        grid = createArrayGrid(magicSquareSize)
+    else:
+        grid = [[0 for x in range(magicSquareSize)]
+                for y in range(magicSquareSize)]
+
+    # Calculate the magic constant
+    magicConstant = magicSquareSize * (magicSquareSize ** 2 + 1) // 2
+
+    # Place a random number in a random place in the grid
+    solutionGrid = None
+    if startPos is None:
+        startPos = (rand(magicSquareSize), rand(magicSquareSize))
+        startNum = rand(1, magicConstant // 2)
+
+        # Make sure the puzzle can actually be solved, otherwise pick another starting number (the solution is kept for hints)
+        while not sparse and (solutionGrid := solveGrid(magicSquareSize, startPos, startNum)) is None:
+            startNum = rand(1, magicConstant // 2)
+    elif not sparse:
+        solutionGrid = solveGrid(magicSquareSize, startPos, startNum)
+
+    # Keep track of the row and column sums and the numbers used as moves are made
+    gameState = createGameState(grid, magicConstant, startPos, magicSquareSize)
+    setCell(gameState, startPos[0], startPos[1], startNum)
+
+    return gameState, solutionGrid
+
+
+def getPositionError(gameState, posX, posY):
+    # posX and posY count from 1, the same as the player types them
+    gridSize = gameState["gridSize"]
+
+    # Make sure they're not changing the starting number
+    if (posX - 1, posY - 1) == gameState["startPos"]:
+        return "You cannot replace the starting number. Please try another position."
+
+    # Make sure the coordinate is in grid
+    if posX > gridSize or posY > gridSize or posX <= 0 or posY <= 0:
+        return "The given position falls outside the grid. Please try another position."
+
+    return None
+
+
+def getNumberError(gameState, newNumber):
+    magicConst = gameState["magicConstant"]
+
+    # Check if new number is smaller than magic constant
+    if newNumber >= magicConst or newNumber <= 0:
+        return f"Please make sure the number inputted is below the magic constant ({str(magicConst)}), and larger than 0"
+
+    # Check if new number is unique
+    if newNumber in gameState["usedNumbers"]:
+        return "That number has already been used. Please use a unique number"
+
+    return None
+
+
+def applyMove(gameState, action, posX, posY, newNumber=0):
+    # Makes one move (add, change, or remove at x, y counting from 1) without any prompts.
+    # Returns why the move isn't allowed, or None once it's been made.
+    if action not in ["a", "c", "r"]:
+        return "Please provide a valid option (Add -> a, Change -> c, Remove -> r)."
+
+    moveError = getPositionError(gameState, posX, posY)
+    if moveError is None and action != "r":
+        moveError = getNumberError(gameState, newNumber)
+    if moveError is not None:
+        return moveError
+
+    recordMove(gameState, posX - 1, posY - 1, newNumber if action != "r" else 0)
+    gameState["moveCount"] += 1
+    return None
+
+
+def recordMove(gameState, posX, posY, newNumber):
+    # Makes the move and adds it to the journal, dropping any moves that were undone since they can't be redone anymore
+    journal = gameState["journal"]
+    del journal[gameState["journalPosition"]:]
+    journal.append((posX, posY, getCell(gameState, posX, posY), newNumber))
+    gameState["journalPosition"] += 1
+
+    setCell(gameState, posX, posY, newNumber)
+
+
+def undoMove(gameState):
+    # Puts back the number from before the last move. Returns why it can't, or None once it's done.
+    if gameState["journalPosition"] == 0:
+        return "There are no moves to undo."
+
+    gameState["journalPosition"] -= 1
+    posX, posY, oldNumber, newNumber = gameState["journal"][gameState["journalPosition"]]
+    setCell(gameState, posX, posY, oldNumber)
+    gameState["moveCount"] += 1
+    return None
+
+
+def redoMove(gameState):
+    if gameState["journalPosition"] == len(gameState["journal"]):
+        return "There are no moves to redo."
+
+    posX, posY, oldNumber, newNumber = gameState["journal"][gameState["journalPosition"]]
+    gameState["journalPosition"] += 1
+    setCell(gameState, posX, posY, newNumber)
+    gameState["moveCount"] += 1
+    return None
+
+
+def saveGame(fname, gameState):
+    gridSize = gameState["gridSize"]
+    startPos = gameState["startPos"]
+    journal = gameState["journal"]
+
+    # Each move only needs its cell and new number, the old number is worked out again when the game is loaded
+    moveData = array("Q")
+    for posX, posY, oldNumber, newNumber in journal:
+        moveData.append(posY * gridSize + posX)
+        moveData.append(newNumber)
+    if sys.byteorder != "little":
+        moveData.byteswap()
+
+    with open(fname, "wb") as file:
+        file.write(journalHeader.pack(journalFileType, 1, gridSize, startPos[0], startPos[1], getCell(gameState, *startPos),
+                                      gameState["moveCount"], len(journal), gameState["journalPosition"]))
+        file.write(moveData.tobytes())
+
+
+def trySaveGame(fname, gameState):
+    # Saves the game, returning why it couldn't be saved or None if it was
+    try:
+        saveGame(fname, gameState)
+    except (OSError, ValueError, struct.error) as saveError:
+        return str(saveError)
+
+    return None
+
+
+def loadGame(fname):
+    # Returns the game state and a solution (if createGame would have made one) for a game saved with saveGame
+    with open(fname, "rb") as file:
+        fileType, version, gridSize, startX, startY, startNum, moveCount, journalLength, journalPosition = \
+            journalHeader.unpack(file.read(journalHeader.size))
+
+        if fileType != journalFileType or version != 1:
+            raise ValueError(f"{fname} isn't a saved Squared Magic game")
+
+        moveData = array("Q")
+        moveData.frombytes(file.read())
+        if sys.byteorder != "little":
+            moveData.byteswap()
+
+    if len(moveData) != 2 * journalLength or journalPosition > journalLength:
+        raise ValueError(f"{fname} is missing some of its moves")
+
+    # The file could have been changed since it was saved, so everything in it is checked the same way as the player's moves
+    magicConstant = gridSize * (gridSize ** 2 + 1) // 2
+    if gridSize <= 2 or startX >= gridSize or startY >= gridSize or not 0 < startNum < magicConstant:
+        raise ValueError(f"{fname} has a grid size or starting number that isn't allowed")
+
+    # Replay every move (including the ones that were undone), then undo back to where the game was saved
+    gameState, solutionGrid = createGame(gridSize, (startX, startY), startNum)
+    for moveIdx in range(journalLength):
+        cellIdx, newNumber = moveData[2 * moveIdx], moveData[2 * moveIdx + 1]
+        if cellIdx >= gridSize ** 2:
+            raise ValueError(f"Move {str(moveIdx + 1)} in {fname} falls outside the grid")
+
+        posX, posY = cellIdx % gridSize, cellIdx // gridSize
+        moveError = getPositionError(gameState, posX + 1, posY + 1)
+        if moveError is None and newNumber != 0:
+            moveError = getNumberError(gameState, newNumber)
+        if moveError is not None:
+            raise ValueError(f"Move {str(moveIdx + 1)} in {fname} isn't allowed: {moveError}")
+
+        recordMove(gameState, posX, posY, newNumber)
+    for moveIdx in range(journalLength - journalPosition):
+        undoMove(gameState)
+
+    gameState["moveCount"] = moveCount
+    return gameState, solutionGrid
+
+
+def getSolveStats(timeSolveStart, endSolveTime, moveCount):
+    # Total time (rounded to 2 decimal points) and time per move
+    timeToComplete = round(endSolveTime - timeSolveStart, 2)
+    timePerMove = timeToComplete / max(moveCount, 1)
+    return timeToComplete, timePerMove
+
+
+def printSolveStats(timeSolveStart, endSolveTime, moveCount):
+    timeToComplete, timePerMove = getSolveStats(timeSolveStart, endSolveTime, moveCount)
+    print(f"Total time: {str(timeToComplete)}s")
+    print(f"Total moves: {str(moveCount)} move(s)")
+    print(f"Time per move: {str(timePerMove)}s")
+
+
+def checkResult(condition, message):
+    # Like assert, but still checked when Python runs with -O
+    if not condition:
+        raise AssertionError(message)
+
+
+def runSelfTests():
+    # A row that already adds up can keep its empty cell, so it isn't dead
+    gameState = createGameState([[0 for x in range(3)] for y in range(3)], 15)
+    setCell(gameState, 0, 0, 6)
+    setCell(gameState, 1, 0, 9)
+    checkResult(("row", 0) not in gameState["deadLines"], "A row of 6, 9 and an empty cell adds up to 15")
+
+    # Filling in a solution (which can leave cells empty) should never warn about a line along the way
+    randomGenerator = Random(0)
+    for size in range(4, 8):
+        for gameIdx in range(20):
+            gameState, solutionGrid = createGame(size, randomGenerator=randomGenerator, sparse=False)
+            for posY in range(size):
+                for posX in range(size):
+                    if getCell(gameState, posX, posY) == 0 and solutionGrid[posY][posX] != 0:
+                        setCell(gameState, posX, posY, int(solutionGrid[posY][posX]))
+
+            checkResult(isGridSolved(gameState), f"Filling in the solution solves a {size}x{size} grid")
+            checkResult(not gameState["deadLines"], f"No line is dead in a solved {size}x{size} grid")
+
+    # Saved games come back the way they were
+    with tempfile.TemporaryDirectory() as tempDir:
+        saveFname = os.path.join(tempDir, "selfTest.sqm")
+        gameState, solutionGrid = createGame(3, (1, 1), 5)
+        for action, posX, posY, newNumber in (("a", 1, 1, 4), ("a", 3, 3, 6), ("r", 1, 1, 0)):
+            applyMove(gameState, action, posX, posY, newNumber)
+        undoMove(gameState)
+        saveGame(saveFname, gameState)
+        loadedState = loadGame(saveFname)[0]
+        checkResult(loadedState["grid"] == gameState["grid"] and loadedState["usedNumbers"] == gameState["usedNumbers"],
+                    "A loaded game has the same grid and numbers as the saved one")
+
+        # Saved games that couldn't have come from real moves (on the start cell, a used number, a number that's too big,
+        # outside the grid, the same number twice, or a grid size of 0) can't be loaded
+        for loadGridSize, moves in ((3, [(1, 1, 4)]), (3, [(0, 0, 5)]), (3, [(0, 0, 15)]), (3, [(9, 0, 4)]),
+                                    (3, [(0, 0, 4), (1, 0, 4)]), (0, [])):
+            moveData = array("Q", [value for posX, posY, newNumber in moves for value in (posY * 3 + posX, newNumber)])
+            with open(saveFname, "wb") as file:
+                file.write(journalHeader.pack(journalFileType, 1, loadGridSize, 1, 1, 5, len(moves), len(moves), len(moves)))
+                file.write(moveData.tobytes())
+
+            try:
+                loadGame(saveFname)
+            except ValueError:
+                continue
+            raise AssertionError(f"A saved {loadGridSize}x{loadGridSize} game with the moves {moves} can't be loaded")
+
+
+if __name__ == "__main__":
+    # python main.py --verify only runs the checks
+    if sys.argv[1:] == ["--verify"]:
+        runSelfTests()
+        print("All tests passed")
+        sys.exit()
+
+    # Instruction screen
+    print("""
 ---- WELCOME TO SQUARED MAGIC! ----
 Welcome to Squared Magic, a game where you solve a modified magic square puzzle as quickly as possible!
 
 Instructions:
   1. You will first be asked about how large you want your square to be. This can be any value larger than 2. 
   2. After that, the magic square will be printed on the screen, as well as the sum that you should have in each row and column. 
-  3. You will then be asked whether you want to add, change, or remove a number (input a, c, or r respectively), as well as the position. Note that you cannot remove the original number.
+  3. You will then be asked whether you want to add, change, or remove a number (input a, c, or r respectively), as well as the position. Note that you cannot remove the original number. Grids larger than 15 are shown 15 by 15 at a time, and you can move the view around with v. If you get stuck, you can ask for a hint with h. You can also undo (u) or redo (y) your moves, and save (s) the game to carry on later.
   4. If you are adding / changing, you will also be asked what number you'd like to change it to. Note that this number must be smaller than the sum previously stated.
   5. The action will be carried out. If this is a winning move, then you will be told so. Otherwise, the game continues until you complete the magic square.
   6. Once you complete the square, you'll be told your total time, as well as average time per move!
@@ -104,166 +1176,226 @@ Good luck, and have fun!
       
 """)
 
-playAgainResp = ""
-while playAgainResp != "No":
-    # For formatting
-    print()
+    # A saved game can be given to carry on with it (python main.py savedGame.sqm)
+    savedGameFname = sys.argv[1] if len(sys.argv) > 1 else None
+
+    # Every finished game is kept, so the best times can be shown
+    leaderboard = openLeaderboard()
 
-    # Ask user for magic square size
-    while (magicSquareSize := int(input("What would you like the size of your magic square to be? "))) <= 2:
-        print("Please input a number larger than 2")
+    playAgainResp = ""
+    while playAgainResp != "No":
+        # For formatting
         print()
 
-    # Generate the grid
-    grid = [[0 for x in range(magicSquareSize)]
-            for y in range(magicSquareSize)]
+        gameState = None
+        if savedGameFname:
+            # Carry on from the saved game, only the first time around (a new game is started if it can't be loaded)
+            try:
+                gameState, solutionGrid = loadGame(savedGameFname)
+                magicSquareSize = gameState["gridSize"]
+            except (OSError, ValueError, struct.error) as loadError:
+                print(f"Couldn't load {savedGameFname}: {str(loadError)}")
+                print("Starting a new game instead.")
+                print()
+            savedGameFname = None
 
-    # Calculate the magic constant
-    magicConstant = magicSquareSize * (magicSquareSize ** 2 + 1) // 2
+        if gameState is None:
+            # Ask user for magic square size
+            while (magicSquareSize := int(input("What would you like the size of your magic square to be? "))) <= 2:
+                print("Please input a number larger than 2")
+                print()
 
-    # Generate a dictionary with numbers from 0 to the max allowed for frequency array
-    gridNumFreqs = {i: 0 for i in range(magicConstant)}
-    gridNumFreqs[0] = magicSquareSize ** 2
+            # Set up a random puzzle
+            gameState, solutionGrid = createGame(magicSquareSize)
+        magicConstant = gameState["magicConstant"]
 
-    # Place a random number in a random place in the grid
-    startPos = (randrange(magicSquareSize), randrange(magicSquareSize))
-    randStartNum = randrange(1, magicConstant // 2)
-    grid[startPos[1]][startPos[0]] = randStartNum
+        # Get max possible length of number to space out grid evenly
+        maxNumLen = len(str(magicConstant)) + 2
 
-    # Ensure placement is reflected in frequency array
-    gridNumFreqs[randStartNum] = 1
+        # Only show part of the grid at once if it's too big for the terminal
+        viewport = None
+        moveChoices = ["a", "c", "r", "h", "u", "y", "s"]
+        moveChoicePrompt = "Would you like to add (a), change (c), or remove a number (r), get a hint (h), undo (u), redo (y), or save (s)? "
+        if magicSquareSize > maxViewportSize:
+            viewport = [0, 0, maxViewportSize]
+            moveChoices.append("v")
+            moveChoicePrompt = "Would you like to add (a), change (c), or remove a number (r), get a hint (h), undo (u), redo (y), save (s), or move the view (v)? "
 
-    # Get max possible length of number to space out grid evenly
-    maxNumLen = len(str(magicConstant)) + 2
+        # Output magic sum
+        print(f"Your magic sum: {str(magicConstant)}!")
 
-    # Output magic sum
-    print(f"Your magic sum: {str(magicConstant)}!")
+        # Statistic vars (moves are counted in the game state)
+        timeSolveStart = time()
 
-    # Statistic vars
-    timeSolveStart = time()
-    moveCount = 0
+        # Run as long as possible until grid is solved
+        while not isGridSolved(gameState):
+            # Print grid with some spacing
+            if viewport:
+                print(
+                    f"Showing x {viewport[0] + 1}-{viewport[0] + viewport[2]} and y {viewport[1] + 1}-{viewport[1] + viewport[2]} of {magicSquareSize}")
+            printGrid(gameState, maxNumLen, viewport)
+            print()
 
-    # Run as long as possible until grid is solved
-    while not checkGrid(grid, magicConstant):
-        # Print grid with some spacing
-        printGrid(grid, maxNumLen)
-        print()
+            # Prompt user for whether they'd like to add, remove, or change
+            addChangeRemoveChoice = input(moveChoicePrompt)
 
-        # Prompt user for whether they'd like to add, remove, or change
-        addChangeRemoveChoice = input(
-            "Would you like to add (a), change (c), or remove a number (r)? ")
+            # Validate that they gave one of the accepted choices
+            while addChangeRemoveChoice not in moveChoices:
+                print("Please provide a valid option (Add -> a, Change -> c, Remove -> r, Hint -> h, Undo -> u, Redo -> y, Save -> s).")
+                print()
+                addChangeRemoveChoice = input(moveChoicePrompt)
 
-        # Validate that they gave one of the accepted choices
-        while addChangeRemoveChoice not in ["a", "c", "r"]:
-            print("Please provide a valid option (Add -> a, Change -> c, Remove -> r).")
-            print()
-            addChangeRemoveChoice = input(
-                "Would you like to add (a), change (c), or remove a number (r)? ")
+            # Show what goes in a position in the solution found at the start, which doesn't count as a move
+            if addChangeRemoveChoice == "h":
+                rawCoordData = input(
+                    "Which position would you like a hint for? (in format x y) ")
 
-        # Get the position to place the number
-        rawCoordData = input(
-            "What position would you like to change? (in format x y) ")
+                while len(rawCoordData.split()) != 2 or not rawCoordData.replace(" ", "").isnumeric() or \
+                        not all(1 <= int(coordinate) <= magicSquareSize for coordinate in rawCoordData.split()):
+                    print("Please provide 2 integers inside the grid.")
+                    print()
+                    rawCoordData = input(
+                        "Which position would you like a hint for? (in format x y) ")
 
-        # Validate that it is only 2 numbers
-        while len(rawCoordData.split()) != 2:
-            print("Please provide the appropriate number of numbers.")
-            print()
-            rawCoordData = input(
-                "What position would you like to change? (in format x y) ")
+                hintX, hintY = [int(coordinate) for coordinate in rawCoordData.split()]
 
-        # Validate there are only numbers and no words / characters
-        while not rawCoordData.replace(" ", "").isnumeric():
-            print("Please provide integers.")
-            print()
-            rawCoordData = input(
-                "What position would you like to change? (in format x y) ")
+                # Sparse grids only find a solution the first time a hint is needed
+                if solutionGrid is None:
+                    startPos = gameState["startPos"]
+                    solutionGrid = solveGrid(magicSquareSize, startPos, getCell(gameState, *startPos))
 
-        # Convert input into actual numbers
-        posX, posY = [int(coordinate) for coordinate in rawCoordData.split()]
+                hintNumber = solutionGrid[hintY - 1][hintX - 1]
 
-        # Make sure they're not changing the starting number
-        while (posX - 1, posY - 1) == startPos:
-            print("You cannot replace the starting number. Please try another position.")
-            print()
-            rawCoordData = input(
-                "What position would you like to change? (in format x y) ")
-            posX, posY = [int(coordinate)
-                          for coordinate in rawCoordData.split()]
+                if hintNumber == 0:
+                    print("Hint: that position can be left empty.")
+                else:
+                    print(f"Hint: {str(hintNumber)} goes in that position.")
 
-        # Make sure the coordinate is in grid
-        while posX > magicSquareSize or posY > magicSquareSize or posX <= 0 or posY <= 0:
-            print(
-                "The given position falls outside the grid. Please try another position.")
-            print()
-            rawCoordData = input(
-                "What position would you like to change? (in format x y) ")
-            posX, posY = [int(coordinate)
-                          for coordinate in rawCoordData.split()]
+                print("\n")
+                continue
 
-        # Account for 0-based indices
-        posX -= 1
-        posY -= 1
+            # Undo or redo the last move, which counts as a move
+            if addChangeRemoveChoice in ["u", "y"]:
+                journalError = undoMove(gameState) if addChangeRemoveChoice == "u" else redoMove(gameState)
+                if journalError is not None:
+                    print(journalError)
 
-        if addChangeRemoveChoice in ["a", "c"]:
-            choiceExpanded = ""
+                print("\n")
+                continue
 
-            if addChangeRemoveChoice == "a":
-                choiceExpanded = "add"
-            elif addChangeRemoveChoice == "c":
-                choiceExpanded = "change"
+            # Save the game so it can be carried on later
+            if addChangeRemoveChoice == "s":
+                saveFname = input("What file would you like to save the game to? ")
 
-            # Request number
-            newNumber = int(
-                input(f"What number would you like to {choiceExpanded} in that position? "))
+                # Ask again if the file can't be written (like a folder that doesn't exist)
+                while (saveError := trySaveGame(saveFname, gameState)) is not None:
+                    print(f"Couldn't save to {saveFname}: {saveError}")
+                    print()
+                    saveFname = input("What file would you like to save the game to? ")
 
-            # Check if new number is smaller than magic constant, loop until it is
-            while newNumber >= magicConstant or newNumber <= 0:
-                print(
-                    f"Please make sure the number inputted is below the magic constant ({str(magicConstant)}), and larger than 0")
+                print(f"Saved! Run the game with python main.py {saveFname} to carry on.")
+
+                print("\n")
+                continue
+
+            # Move the view around the grid, which doesn't count as a move
+            if addChangeRemoveChoice == "v":
+                rawCoordData = input(
+                    "Which position should be at the top left of the view? (in format x y) ")
+
+                while len(rawCoordData.split()) != 2 or not rawCoordData.replace(" ", "").isnumeric():
+                    print("Please provide 2 integers.")
+                    print()
+                    rawCoordData = input(
+                        "Which position should be at the top left of the view? (in format x y) ")
+
+                viewX, viewY = [int(coordinate) for coordinate in rawCoordData.split()]
+                moveViewport(viewport, magicSquareSize, viewX - 1, viewY - 1)
+
+                print("\n")
+                continue
+
+            # Get the position to place the number
+            rawCoordData = input(
+                "What position would you like to change? (in format x y) ")
+
+            # Validate that it is only 2 numbers
+            while len(rawCoordData.split()) != 2:
+                print("Please provide the appropriate number of numbers.")
                 print()
-                newNumber = int(
-                    input(f"What number would you like to {choiceExpanded} in that position? "))
+                rawCoordData = input(
+                    "What position would you like to change? (in format x y) ")
 
-            # Check if new number is unique
-            while gridNumFreqs[newNumber] >= 1:
-                print(f"That number has already been used. Please use a unique number")
+            # Validate there are only numbers and no words / characters
+            while not rawCoordData.replace(" ", "").isnumeric():
+                print("Please provide integers.")
                 print()
+                rawCoordData = input(
+                    "What position would you like to change? (in format x y) ")
+
+            # Convert input into actual numbers
+            posX, posY = [int(coordinate) for coordinate in rawCoordData.split()]
+
+            # Make sure they're not changing the starting number, and that the coordinate is in grid
+            while (positionError := getPositionError(gameState, posX, posY)) is not None:
+                print(positionError)
+                print()
+                rawCoordData = input(
+                    "What position would you like to change? (in format x y) ")
+                posX, posY = [int(coordinate)
+                              for coordinate in rawCoordData.split()]
+
+            newNumber = 0
+            if addChangeRemoveChoice in ["a", "c"]:
+                choiceExpanded = ""
+
+                if addChangeRemoveChoice == "a":
+                    choiceExpanded = "add"
+                elif addChangeRemoveChoice == "c":
+                    choiceExpanded = "change"
+
+                # Request number
                 newNumber = int(
                     input(f"What number would you like to {choiceExpanded} in that position? "))
 
-            # Change number in that position
-            grid[posY][posX] = newNumber
-            gridNumFreqs[newNumber] += 1
+                # Check if new number is smaller than magic constant and unique, loop until it is
+                while (numberError := getNumberError(gameState, newNumber)) is not None:
+                    print(numberError)
+                    print()
+                    newNumber = int(
+                        input(f"What number would you like to {choiceExpanded} in that position? "))
 
-        elif addChangeRemoveChoice == "r":
-            # Remove the number in that position
-            gridNumFreqs[grid[posY][posX]] -= 1
-            grid[posY][posX] = 0
+            # Change or remove the number in that position, and count the move
+            applyMove(gameState, addChangeRemoveChoice, posX, posY, newNumber)
 
-        # Increment move count
-        moveCount += 1
+            # Let the player know straight away if a row or column can't be finished anymore
+            if (deadLineMessage := getDeadLineMessage(gameState)) is not None:
+                print(deadLineMessage)
 
-        # For spacing
-        print("\n")
-    else:
-        # User completed, get end time
-        endSolveTime = time()
-        timeToComplete = round(endSolveTime - timeSolveStart, 2)
-        timePerMove = timeToComplete / moveCount
-
-        # Print stats
-        print("Congrats! You completed the magic square.")
-        print(f"Total time: {str(timeToComplete)}s")
-        print(f"Total moves: {str(moveCount)} move(s)")
-        print(f"Time per move: {str(timePerMove)}s")
-        print()
+            # For spacing
+            print("\n")
+        else:
+            # User completed, get end time
+            endSolveTime = time()
 
-        # Check if would like to play again
-        playAgainResp = input("Would you like to play again? ")
-        while playAgainResp not in ["Yes", "No"]:
-            print("Please provide a proper response (Yes, No).")
+            # Print stats
+            print("Congrats! You completed the magic square.")
+            printSolveStats(timeSolveStart, endSolveTime, gameState["moveCount"])
             print()
+
+            # Save the result and show how it compares
+            timeToComplete, timePerMove = getSolveStats(timeSolveStart, endSolveTime, gameState["moveCount"])
+            addResults(leaderboard, [(magicSquareSize, timeToComplete, gameState["moveCount"])])
+            printTopResults(leaderboard, magicSquareSize)
+            print()
+
+            # Check if would like to play again
             playAgainResp = input("Would you like to play again? ")
-else:
-    # User has decided not to continue
-    print("See you later!")
+            while playAgainResp not in ["Yes", "No"]:
+                print("Please provide a proper response (Yes, No).")
+                print()
+                playAgainResp = input("Would you like to play again? ")
+    else:
+        # User has decided not to continue
+        print("See you later!")
+        leaderboard.close()
@@ -0,0 +1,298 @@
+#-----------------------------------------------------------------------------
+# Name:        Tax Software (batch.py)
+# Purpose:     calculate federal income tax for every taxpayer in a payroll export
+#
+# Author:      Aritro Saha
+# Created:     19-Oct-2026
+# Updated:     19-Oct-2026
+#-----------------------------------------------------------------------------
+
+from typing import Iterator, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+
+from main import getTaxableAmount, getTotalIncomeTaxBatch, getIncomeTaxUnits, toCents, unitsToDollars, np, setUpLogging, defaultTaxYear
+
+# Columns written for every taxpayer
+outputColumns = ["taxpayer", "taxYear", "totalIncome", "taxableIncome", "incomeTax", "incomeTaxAfterBPA", "error"]
+
+# Written before the error column when a province is given
+provinceColumn = "totalTaxWithProvince"
+
+def readRows(fname: str, fileFormat: str) -> Iterator[Tuple[str, str, str, str]]:
+  '''
+  Reads (taxpayer, income type, amount, tax year) rows from a payroll export one at a time.
+
+  Reads the rows of a CSV file (with a taxpayer, incomeType and amount header) or an NDJSON file (one object with those keys per line) without loading the whole file. A taxYear column (or key) is optional, and rows without one are for the default tax year. The amount and tax year are left as they were in the file.
+
+  Parameters
+  ----------
+  fname : str
+    The name of the file to read.
+  fileFormat : str
+    Either "csv" or "ndjson".
+
+  Returns
+  -------
+  Iterator[tuple[str, str, str, str]]
+    The taxpayer, income type, amount and tax year of each row.
+
+  Raises
+	------
+	ValueError
+		If fileFormat is not "csv" or "ndjson"
+  '''
+  logging.info("Running readRows('%s', '%s')", fname, fileFormat)
+
+  if fileFormat not in ["csv", "ndjson"]:
+    logging.error("fileFormat must be csv or ndjson")
+    raise ValueError("fileFormat must be csv or ndjson")
+
+  with open(fname, newline="") as file:
+    if fileFormat == "csv":
+      for row in csv.DictReader(file):
+        yield row["taxpayer"], row["incomeType"], row["amount"], row.get("taxYear") or str(defaultTaxYear)
+    else:
+      for line in file:
+        # Skip blank lines
+        if line.strip():
+          row = json.loads(line)
+          yield str(row["taxpayer"]), row["incomeType"], row["amount"], str(row.get("taxYear") or defaultTaxYear)
+
+def groupTaxpayers(rows: Iterator[Tuple[str, str, str, str]], chunkSize: int) -> Iterator[List[Tuple[str, str, List[Tuple[str, str]]]]]:
+  '''
+  Groups rows by taxpayer and tax year, in chunks of whole taxpayers.
+
+  Groups the rows of each taxpayer (for each tax year) together, and hands them out chunkSize taxpayers at a time, so only one chunk is ever held in memory. The rows must be sorted by taxpayer and then tax year (as text), so a taxpayer whose rows are split up is caught by comparing them with the last taxpayer, without remembering every taxpayer. If they aren't sorted, a ValueError will be raised.
+
+  Parameters
+  ----------
+  rows : Iterator[tuple[str, str, str, str]]
+    The taxpayer, income type, amount and tax year of each row.
+  chunkSize : int
+    How many taxpayers to put in each chunk.
+
+  Returns
+  -------
+  Iterator[list[tuple[str, str, list[tuple[str, str]]]]]
+    Chunks of taxpayers and their tax year, along with the income type and amount of each of their rows.
+
+  Raises
+	------
+	ValueError
+		If the rows aren't sorted by taxpayer and tax year
+  '''
+  chunk = []
+  currentTaxpayer = None
+  currentIncomes = []
+
+  for taxpayer, incomeType, amount, taxYear in rows:
+    # A new taxpayer (or tax year) means the last one has all of their rows
+    if (taxpayer, taxYear) != currentTaxpayer:
+      # Anything that sorts before the last taxpayer could be one of the taxpayers already filed
+      if currentTaxpayer is not None and (taxpayer, taxYear) < currentTaxpayer:
+        logging.error("Rows must be sorted by taxpayer and tax year, but taxpayer '%s' (%s) comes after '%s' (%s)", taxpayer, taxYear, *currentTaxpayer)
+        raise ValueError(f"Rows must be sorted by taxpayer and tax year, but taxpayer '{taxpayer}' ({taxYear}) comes after '{currentTaxpayer[0]}' ({currentTaxpayer[1]})")
+
+      if currentIncomes:
+        chunk.append((*currentTaxpayer, currentIncomes))
+
+        if len(chunk) >= chunkSize:
+          yield chunk
+          chunk = []
+
+      currentTaxpayer = (taxpayer, taxYear)
+      currentIncomes = []
+
+    currentIncomes.append((incomeType, amount))
+
+  if currentIncomes:
+    chunk.append((*currentTaxpayer, currentIncomes))
+  if chunk:
+    yield chunk
+
+def fileTaxpayers(taxpayers: List[Tuple[str, str, List[Tuple[str, str]]]], province: str = None) -> List[list]:
+  '''
+  Calculates the income tax of a chunk of taxpayers.
+
+  Adds up the total and taxable income (with getTaxableAmount) of each taxpayer, and calculates their income tax before and after the Basic Personal Amount credit, with the federal tax table of their tax year. Taxpayers are taxed together for each tax year, and each table is only loaded once per process. Taxpayers with a row that can't be used (or a tax year with no table) get an error message instead of their tax.
+
+  Parameters
+  ----------
+  taxpayers : list[tuple[str, str, list[tuple[str, str]]]]
+    Each taxpayer and their tax year, along with the income type and amount of each of their rows.
+  province : str
+    If given, the total federal and provincial tax after both BPA credits is also calculated, with one combined table for each tax year.
+
+  Returns
+  -------
+  list[list]
+    One output row (in the order of outputColumns, with provinceColumn before the error if there's a province) for each taxpayer.
+  '''
+  outputRows = []
+
+  # The rows and taxable incomes filed under each tax table
+  filedRows = {}
+  taxableIncomes = {}
+
+  for taxpayer, taxYear, incomes in taxpayers:
+    taxTableName = f"{taxYear}-federal"
+    totalIncome = 0
+    taxableIncome = 0
+
+    try:
+      for incomeType, amount in incomes:
+        amount = float(amount)
+        totalIncome += amount
+        taxableIncome += getTaxableAmount(incomeType, amount, taxTableName)[1]
+
+      # Amounts that are fine on their own can still add up past the largest float
+      if not math.isfinite(totalIncome):
+        raise ValueError("total income is too large")
+    except (TypeError, ValueError, OverflowError) as e:
+      logging.error("Could not file taxpayer '%s': %s", taxpayer, e)
+      outputRows.append([taxpayer, taxYear, "", "", "", ""] + ([""] if province else []) + [str(e)])
+      continue
+
+    outputRows.append([taxpayer, taxYear, round(totalIncome, 2), round(taxableIncome, 2)])
+    filedRows.setdefault(taxTableName, []).append(outputRows[-1])
+    taxableIncomes.setdefault(taxTableName, []).append(taxableIncome)
+
+  for taxTableName in filedRows:
+    # The federal and provincial tables (and both credits) are combined into one, like "2021-federal+2021-ontario"
+    columnTables = [(taxTableName, False), (taxTableName, True)]
+    if province:
+      columnTables.append((f"{taxTableName}+{taxTableName.split('-')[0]}-{province}", True))
+
+    # Tax everyone in the chunk with the same table at once if NumPy is installed
+    columns = []
+    error = ""
+    for columnTableName, applyBasicPersonalAmount in columnTables:
+      try:
+        if np is not None:
+          column = getTotalIncomeTaxBatch(taxableIncomes[taxTableName], applyBasicPersonalAmount, columnTableName).tolist()
+        else:
+          column = [unitsToDollars(getIncomeTaxUnits(toCents(taxableIncome), columnTableName, applyBasicPersonalAmount))
+                    for taxableIncome in taxableIncomes[taxTableName]]
+        columns.append([round(tax, 2) for tax in column])
+      except ValueError as e:
+        # Only the provincial table can be missing, the federal one was already used for the taxable income
+        logging.error("Could not file taxpayers with '%s': %s", columnTableName, e)
+        columns.append([""] * len(filedRows[taxTableName]))
+        error = str(e)
+
+    for outputRow, taxes in zip(filedRows[taxTableName], zip(*columns)):
+      outputRow.extend(list(taxes) + [error])
+
+  return outputRows
+
+def fileBatch(inputFname: str, outputFname: str, fileFormat: str, workers: int, chunkSize: int, logLevel: int = None, logSampleRate: int = 1, province: str = None) -> int:
+  '''
+  Calculates the income tax of every taxpayer in a payroll export.
+
+  Streams the rows of a payroll export (sorted by taxpayer and tax year, see groupTaxpayers), files chunks of taxpayers in a process pool, and writes the results to a CSV file in the same order as the export. At most two chunks per worker are in memory at once, no matter how large the export is. The results are written to a ".partial" file first, and only replace the output file once every taxpayer is filed, so a run that fails part way never leaves results behind. Logging in the calling process is left as it is, so a program using fileBatch keeps its own logging setup.
+
+  Parameters
+  ----------
+  inputFname : str
+    The name of the payroll export to read.
+  outputFname : str
+    The name of the CSV file to write the results to.
+  fileFormat : str
+    The format of the payroll export, either "csv" or "ndjson".
+  workers : int
+    How many processes to file taxpayers with.
+  chunkSize : int
+    How many taxpayers each process files at a time.
+  logLevel : int
+    If given, the worker processes log to log.txt (with setUpLogging) from this level up, otherwise their logging isn't set up.
+  logSampleRate : int
+    How many per-bracket log records there are for each one logged, in the worker processes.
+  province : str
+    If given, the total federal and provincial tax of each taxpayer is also written.
+
+  Returns
+  -------
+  int
+    The number of taxpayers filed.
+
+  Raises
+	------
+	ValueError
+		If fileFormat is not "csv" or "ndjson", or the rows aren't sorted by taxpayer and tax year
+  '''
+  logging.info("Running fileBatch('%s', '%s', '%s', %d, %d)", inputFname, outputFname, fileFormat, workers, chunkSize)
+
+  chunks = groupTaxpayers(readRows(inputFname, fileFormat), chunkSize)
+
+  # Each worker is its own process, so it needs logging set up again to write to the same file
+  workerLogging = {"initializer": setUpLogging, "initargs": ("log.txt", logLevel, logSampleRate)} if logLevel is not None else {}
+
+  partialFname = f"{outputFname}.partial"
+  try:
+    taxpayerCount = writeResults(chunks, partialFname, workers, province, workerLogging)
+  except BaseException:
+    if os.path.exists(partialFname):
+      os.remove(partialFname)
+    raise
+  os.replace(partialFname, outputFname)
+
+  logging.info("Filed %d taxpayers", taxpayerCount)
+
+  return taxpayerCount
+
+def writeResults(chunks: Iterator[List[Tuple[str, str, List[Tuple[str, str]]]]], outputFname: str, workers: int, province: str, workerLogging: dict) -> int:
+  # Files the chunks in a process pool (see fileBatch) and writes the results as they come in, returning how many taxpayers were filed
+  taxpayerCount = 0
+
+  with open(outputFname, "w", newline="") as outputFile, ProcessPoolExecutor(workers, **workerLogging) as executor:
+    writer = csv.writer(outputFile)
+    writer.writerow(outputColumns[:-1] + ([provinceColumn] if province else []) + outputColumns[-1:])
+
+    # Keep a few chunks ahead of the writer so every worker stays busy, without reading the whole export
+    pendingChunks = deque()
+    for chunk in chunks:
+      pendingChunks.append(executor.submit(fileTaxpayers, chunk, province))
+
+      if len(pendingChunks) >= 2 * workers:
+        outputRows = pendingChunks.popleft().result()
+        writer.writerows(outputRows)
+        taxpayerCount += len(outputRows)
+
+    while pendingChunks:
+      outputRows = pendingChunks.popleft().result()
+      writer.writerows(outputRows)
+      taxpayerCount += len(outputRows)
+
+  return taxpayerCount
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Calculate federal income tax for every taxpayer in a payroll export.")
+  parser.add_argument("inputFname", help="CSV (taxpayer, incomeType, amount) or NDJSON payroll export")
+  parser.add_argument("outputFname", help="CSV file to write the results to")
+  parser.add_argument("--format", choices=["csv", "ndjson"], help="format of the export (worked out from its extension by default)")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+  parser.add_argument("--chunk-size", type=int, default=10000, help="taxpayers filed at a time by each worker")
+  parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="WARNING", help="taxpayers that can't be filed are logged as errors")
+  parser.add_argument("--log-sample-rate", type=int, default=1, help="log one in this many per-bracket lines")
+  parser.add_argument("--province", help="also write the total federal and provincial tax (like ontario, needs a tax table for each tax year)")
+  args = parser.parse_args()
+
+  fileFormat = args.format or ("ndjson" if args.inputFname.endswith((".ndjson", ".jsonl")) else "csv")
+
+  # Only the program itself sets up logging, fileBatch leaves it to whoever calls it
+  logLevel = getattr(logging, args.log_level)
+  setUpLogging(level=logLevel, sampleRate=args.log_sample_rate)
+
+  try:
+    taxpayerCount = fileBatch(args.inputFname, args.outputFname, fileFormat, args.workers, args.chunk_size,
+                              logLevel, args.log_sample_rate, args.province)
+  except ValueError as e:
+    parser.exit(1, f"Could not file {args.inputFname}: {e}\n")
+  print(f"Filed {taxpayerCount:,} taxpayers to {args.outputFname}")
@@ -7,292 +7,1531 @@
 # Updated:     24-May-2022
 #-----------------------------------------------------------------------------
 
-from typing import Tuple, Union, Callable
+from typing import Tuple, List, Dict, Union, Callable
 import logging
+import math
 import sys
+import os
 import re
+import json
+import queue
+import itertools
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing.util import Finalize
 
-# Set up logging
-logging.basicConfig(filename="log.txt", level=logging.DEBUG, format=' %(asctime)s - %(levelname)s - %(message)s')
+# Used to skip building log messages nobody will see
+rootLogger = logging.getLogger()
+
+# The listener writing log records to the file, the process it was started in, and what stops it when that process exits
+logListener = None
+
+class LazyQueueHandler(QueueHandler):
+  '''
+  A QueueHandler that leaves formatting to the background thread.
+
+  The arguments logged in this program are only numbers and strings, so records don't need to be formatted and copied before they're put on the queue.
+  '''
+
+  def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+    return record
+
+def createSamplingFilter(sampleRate: int) -> Callable[[logging.LogRecord], bool]:
+  '''
+  Creates a logging filter that only lets through some of the high-volume log records.
+  
+  Creates a filter that lets through one in every sampleRate log records logged with extra={"sampled": True} (like the per-bracket lines), and every other log record. If sampleRate is smaller than 1, a ValueError will be raised.
+
+  Parameters
+  ----------
+  sampleRate : int
+    How many sampled log records there are for each one let through (1 lets all of them through).
+  
+  Returns
+  -------
+  Callable[[logging.LogRecord], bool]
+    The filter, which returns whether a log record should be logged.
+
+  Raises
+	------
+	TypeError
+		If sampleRate (int) is not the correct type
+	ValueError
+		If sampleRate is smaller than 1
+  '''
+  # Handle type exceptions
+  if not isinstance(sampleRate, int):
+    raise TypeError("sampleRate is not an int")
+
+  # Handle value exceptions
+  if sampleRate < 1:
+    raise ValueError("sampleRate cannot be smaller than 1")
+
+  sampledCount = itertools.count()
+
+  def samplingFilter(record: logging.LogRecord) -> bool:
+    return not getattr(record, "sampled", False) or next(sampledCount) % sampleRate == 0
+
+  return samplingFilter
+
+def stopLogging() -> None:
+  '''
+  Writes out any log records still waiting, and stops the background thread writing them.
+  '''
+  global logListener
+
+  # A forked process has a copy of the listener, but not its thread
+  if logListener is not None and logListener[1] == os.getpid():
+    logListener[0].stop()
+    logListener[2].cancel()
+  logListener = None
+
+def setUpLogging(fname: str = "log.txt", level: int = logging.DEBUG, sampleRate: int = 1) -> None:
+  '''
+  Sets up logging to a file from a background thread.
+  
+  Sets up logging so log records are put on a queue, and a background thread writes them to a file. Logging never has to wait for the file. Calling it again (for example, in a new process) replaces the last setup. It replaces the handlers of the root logger, so it's only meant to be called by programs run as scripts (like main.py, batch.py and sweep.py), not by the functions other programs import.
+
+  Parameters
+  ----------
+  fname : str
+    The name of the file to log to.
+  level : int
+    The lowest level to log.
+  sampleRate : int
+    How many per-bracket log records there are for each one logged (see createSamplingFilter).
+
+  Raises
+	------
+	TypeError
+		If sampleRate (int) is not the correct type
+	ValueError
+		If sampleRate is smaller than 1
+  '''
+  global logListener
+
+  stopLogging()
+
+  # Records are only formatted on the background thread, right before they're written
+  fileHandler = logging.FileHandler(fname)
+  fileHandler.setFormatter(logging.Formatter(' %(asctime)s - %(levelname)s - %(message)s'))
+
+  logQueue = queue.SimpleQueue()
+  queueHandler = LazyQueueHandler(logQueue)
+  queueHandler.addFilter(createSamplingFilter(sampleRate))
+
+  logging.basicConfig(level=level, handlers=[queueHandler], force=True)
+
+  # Make sure everything is written before the program (or a worker process) exits
+  logListener = (QueueListener(logQueue, fileHandler), os.getpid(), Finalize(None, stopLogging, exitpriority=0))
+  logListener[0].start()
+
+@lru_cache(maxsize=None)
+def importNumPy():
+  '''
+  Imports NumPy the first time a batch function needs it, since it takes longer to import than the rest of the program. None is returned if it isn't installed.
+  '''
+  try:
+    import numpy
+  except ImportError:
+    return None
+
+  return numpy
+
+# Globals that are only worked out the first time they're used, so importing this file doesn't read any files or import NumPy
+lazyGlobals = {
+  "np": lambda: importNumPy(),
+  "incomeTaxRates": lambda: getDefaultTaxTable()["incomeTaxRates"],
+  "taxBrackets": lambda: getDefaultTaxTable()["taxBrackets"],
+  "basicPersonalAmountIncomes": lambda: getDefaultTaxTable()["basicPersonalAmountIncomes"],
+  "basicPersonalAmounts": lambda: getDefaultTaxTable()["basicPersonalAmounts"],
+  "basicPersonalAmountCreditRate": lambda: getDefaultTaxTable()["basicPersonalAmountCreditRate"]
+}
+
+def __getattr__(name: str):
+  # Only called for names that aren't defined yet
+  if name in lazyGlobals:
+    return lazyGlobals[name]()
+
+  raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 def requireValidInput(inpStr: str, incorrectNote: str, checker: Callable[[str], bool]) -> str:
   '''
-  Obtain valid input from a user.
+  Obtain valid input from a user.
+  
+  Obtain valid input from the user by repeatedly asking until their input is verified by a checker function. The input from the user will be returned.
+
+  Parameters
+  ----------
+  inpStr : str
+    The prompt shown to the user before collecting input.
+  incorrectNote: str
+    The prompt shown to the user when their input is invalid.
+  checker: Callable[str, bool]
+    A checker function that takes in the input string and returns a boolean depending on whether the input is valid or not
+  
+  Returns
+  -------
+  str
+    The input from the user.
+
+  Raises
+	------
+	TypeError
+		If inpStr (str), incorrectNote (str), or checker (Callable[[str], bool]) is not the correct type
+  '''
+
+  logging.info(f"Running requireValidInput('{inpStr}', '{incorrectNote}', checker callable)")
+
+  # Handle type errors
+  if not isinstance(inpStr, str):
+    logging.error("inpStr is not a string")
+    raise TypeError("inpStr is not a string")
+  elif not isinstance(incorrectNote, str):
+    logging.error("incorrectNote is not a string")
+    raise TypeError("incorrectNote is not a string")
+  elif not callable(checker):
+    logging.error("checker is not callable")
+    raise TypeError("checker is not a callable")
+
+  # Only exit once checker confirms
+  while not checker(result := input(inpStr)):
+    logging.debug("User did not provide proper input, reprompting.")
+    print(incorrectNote)
+    print()
+
+  logging.info(f"Final result from requireValidInput: {result}")
+  
+  return result
+
+def percentageToDecimal(percentage: Union[int, float]) -> float:
+  '''
+  Convert a percentage to a decimal value.
+  
+  Convert a percentage to a decimal value, given the percentage. If the percentage is smaller than 0, a ValueError will be raised. Otherwise, a decimal representation of the given percentage will be returned.
+
+  Parameters
+  ----------
+  percentage : int or float
+    The percentage to convert.
+  
+  Returns
+  -------
+  float
+    A decimal representation of the given percentage, rounded to 5 decimal points.
+
+  Raises
+	------
+	TypeError
+		If percentage (int, float) is not the correct type
+	ValueError
+		If percentage is smaller than 0
+  '''
+  
+  logging.info("Running percentageToDecimal(%s)", percentage)
+
+  # Handle type errors
+  if not isinstance(percentage, (int, float)):
+    logging.error("Percentage parameter is not an int or float")
+    raise TypeError("Percentage parameter is not an int or float")
+
+  # Handle value errors
+  if percentage < 0:
+    logging.error("Percentage cannot be below 0%")
+    raise ValueError("Percentage cannot be below 0%")
+
+  # Convert percentage to decimal
+  decimalValue = percentage / 100
+
+  if rootLogger.isEnabledFor(logging.INFO):
+    logging.info("Decimal value of percentage: %s", decimalValue)
+    logging.debug("Returning decimal value of percentage rounded to 5 decimal points...")
+  
+  return round(decimalValue, 5)
+
+# Money is worked out exactly as whole numbers: amounts in cents, rates in basis points (hundredths of a percent),
+# and an amount times a rate in millionths of a dollar (cents * basis points). Only the final answers are converted back to dollars.
+unitsPerDollar = 1000000
+
+def toCents(amount: Union[int, float]) -> int:
+  '''
+  Converts an amount of dollars to cents, rounded to the nearest cent (so 0.29, which is really 0.28999..., is still 29 cents). Infinite and NaN amounts (or ones too large to count in cents) can't be converted, so they raise a ValueError.
+  '''
+  cents = amount * 100
+  if not math.isfinite(cents):
+    logging.error("amount must be a finite number small enough to count in cents")
+    raise ValueError("amount must be a finite number small enough to count in cents")
+
+  return round(cents)
+
+def toBasisPoints(rate: Union[int, float]) -> int:
+  '''
+  Converts a rate given as a decimal (like the ones from percentageToDecimal) to basis points.
+  '''
+  return round(rate * 10000)
+
+def unitsToDollars(units: int) -> float:
+  '''
+  Converts an amount in millionths of a dollar (cents times basis points) back to dollars.
+  '''
+  return units / unitsPerDollar
+
+# Tax tables for each year and jurisdiction are kept as JSON files named like "2021-federal.json", with:
+# - incomeTaxRates: the percentage of each type of income that is taxable
+# - taxBrackets: the size of each bracket (null for the last one, which never ends) and the percentage of tax on it
+# - basicPersonalAmount: the full BPA on taxable income up to the first income, the reduced BPA from the second income onwards,
+#   and the non-refundable tax credit rate the BPA is credited at
+taxTablesDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "taxTables")
+
+# The tax table used when none is given, also registered as "federal"
+defaultTaxYear = 2021
+defaultJurisdiction = "federal"
+
+def getTaxableAmount(incomeType: str, amount: Union[int, float], bracketTableName: str = "federal") -> Tuple[float, float]:
+  '''
+  Gets the taxable amount of income given the type and amount
+  
+  Determines the taxable amount of income, given the type of income, and the amount of income. If the income amount is smaller than 0 (or infinite or NaN), or the income type is not a key in incomeTaxRates, a ValueError will be raised. Otherwise, the tax rate and taxed amount will be returned in a tuple.
+
+  Parameters
+  ----------
+  incomeType : str
+    The type of income. The value must be a key in incomeTaxRates.
+  amount : int or float
+    The amount of this type of income.
+  bracketTableName : str
+    The name of the tax table to get the tax rate from, the federal one by default.
+  
+  Returns
+  -------
+  tuple[float, float]
+    A tuple including the taxable percentage and taxable amount, respectively.
+
+  Raises
+	------
+	TypeError
+		If incomeType (str) or amount (int, float) is not the correct type
+	ValueError
+		If incomeType is empty, not a key in incomeTaxRates, or the amount of income is below 0 or not a finite number
+  '''
+
+  logging.info("Running getTaxableAmount('%s', %s, '%s')", incomeType, amount, bracketTableName)
+
+  # Handle type exceptions
+  if not isinstance(incomeType, str):
+    logging.error("incomeType is not a string")
+    raise TypeError("incomeType is not a string")
+
+  if not isinstance(amount, (float, int)):
+    logging.error("amount is not an int or float")
+    raise TypeError("amount is not an int or float")
+
+  # Handle value exceptions
+  if not math.isfinite(amount):
+    logging.error("amount of income must be a finite number")
+    raise ValueError("amount of income must be a finite number")
+
+  if amount < 0:
+    logging.error("amount of income cannot be below 0")
+    raise ValueError("amount of income cannot be below 0")
+
+  if incomeType == "":
+    logging.error("incomeType cannot be empty")
+    raise ValueError("incomeType cannot be empty")
+
+  bracketTable = getBracketTable(bracketTableName)
+
+  # Only attempt to get the tax rate if the income type is recorded
+  if incomeType in bracketTable["incomeTypes"]:
+    rateBasisPoints = bracketTable["incomeTypeRateBasisPoints"][bracketTable["incomeTypes"][incomeType]]
+    taxRate = rateBasisPoints / 10000
+    taxedAmount = unitsToDollars(toCents(amount) * rateBasisPoints)
+
+    if rootLogger.isEnabledFor(logging.INFO):
+      logging.info("Tax rate for %s: %s", incomeType, taxRate)
+      logging.info("Taxable amount: %s", taxedAmount)
+    
+    return taxRate, taxedAmount
+  else:
+    logging.error("Income type does not exist in incomeTaxRates when running getTaxableAmount")
+    raise ValueError("Income type does not exist in incomeTaxRates when running getTaxableAmount")
+
+def compileBracketTable(brackets: List[Tuple[float, float]]) -> Dict[str, List[int]]:
+  '''
+  Compiles a list of tax brackets into cumulative thresholds and base taxes
+  
+  Compiles tax brackets (in the same format as taxBrackets) into where each bracket starts (in cents), the total tax on all of the brackets before it (in millionths of a dollar), and its rate (in basis points). Tax on any income is then the base tax of its bracket, plus the rate on whatever is past the start of the bracket. If there are no brackets, or a bracket has a size or rate below 0, a ValueError will be raised.
+
+  Parameters
+  ----------
+  brackets : list[tuple[float, float]]
+    The size of each bracket and the rate (as a decimal) charged on it, from the lowest bracket to the highest.
+  
+  Returns
+  -------
+  dict[str, list[int]]
+    The compiled table, with the keys "thresholdCents", "baseTaxUnits" and "rateBasisPoints".
+
+  Raises
+	------
+	TypeError
+		If brackets (list[tuple[float, float]]) is not the correct type
+	ValueError
+		If there are no brackets, or a bracket size or rate is below 0
+  '''
+  logging.info("Running compileBracketTable(%s)", brackets)
+
+  # Handle type exceptions
+  if not isinstance(brackets, (list, tuple)) or not all(isinstance(bracket, tuple) and len(bracket) == 2 for bracket in brackets):
+    logging.error("brackets is not a list of (size, rate) tuples")
+    raise TypeError("brackets is not a list of (size, rate) tuples")
+
+  # Handle value exceptions
+  if len(brackets) == 0:
+    logging.error("brackets cannot be empty")
+    raise ValueError("brackets cannot be empty")
+
+  if any(endOfBracket < 0 or rate < 0 for endOfBracket, rate in brackets):
+    logging.error("Bracket sizes and rates cannot be below 0")
+    raise ValueError("Bracket sizes and rates cannot be below 0")
+
+  thresholdCents = []
+  baseTaxUnits = []
+  rateBasisPoints = []
+
+  # Each bracket starts where the last one ended, with all of the tax from the brackets before it (the last bracket never ends)
+  startOfBracket = 0
+  taxBeforeBracket = 0
+  for endOfBracket, rate in brackets:
+    thresholdCents.append(startOfBracket)
+    baseTaxUnits.append(taxBeforeBracket)
+    rateBasisPoints.append(toBasisPoints(rate))
+
+    if endOfBracket == float('inf'):
+      break
+
+    startOfBracket += toCents(endOfBracket)
+    taxBeforeBracket += toCents(endOfBracket) * rateBasisPoints[-1]
+
+  logging.info("Compiled bracket thresholds (cents): %s, base taxes (millionths of a dollar): %s", thresholdCents, baseTaxUnits)
+
+  return {"thresholdCents": thresholdCents, "baseTaxUnits": baseTaxUnits, "rateBasisPoints": rateBasisPoints}
+
+def compileTaxTable(incomeTaxRates: Dict[str, float], taxBrackets: List[Tuple[float, float]], basicPersonalAmountIncomes: Tuple[float, float] = (0, 0), basicPersonalAmounts: Tuple[float, float] = (0, 0), basicPersonalAmountCreditRate: float = 0) -> Dict[str, object]:
+  '''
+  Compiles the rates, brackets and Basic Personal Amount of a tax table into whole numbers
+  
+  Compiles the tax brackets with compileBracketTable, and adds the tax rate of each income type (in basis points, in a list with the position of each income type kept separately) and the Basic Personal Amount (in cents) and its credit rate (in basis points). Nothing has to be converted or checked again when the table is used. With no BPA, nothing is credited.
+
+  Parameters
+  ----------
+  incomeTaxRates : dict[str, float]
+    The tax rate (as a decimal) of each type of income.
+  taxBrackets : list[tuple[float, float]]
+    The size of each bracket and the rate (as a decimal) charged on it, from the lowest bracket to the highest.
+  basicPersonalAmountIncomes : tuple[float, float]
+    The taxable income up to which the full BPA is claimed, and from which the reduced BPA is claimed.
+  basicPersonalAmounts : tuple[float, float]
+    The full and reduced BPA.
+  basicPersonalAmountCreditRate : float
+    The rate (as a decimal) the BPA is credited at.
+  
+  Returns
+  -------
+  dict[str, object]
+    The compiled table, with the keys from compileBracketTable, plus "incomeTypes", "incomeTypeRateBasisPoints", "basicPersonalAmountIncomeCents", "basicPersonalAmountCents" and "basicPersonalAmountCreditBasisPoints".
+
+  Raises
+	------
+	TypeError
+		If taxBrackets is not the correct type
+	ValueError
+		If there are no brackets, or a bracket size, tax rate or BPA is below 0
+  '''
+  # Handle value exceptions
+  if any(rate < 0 for rate in incomeTaxRates.values()) or min(basicPersonalAmountIncomes + basicPersonalAmounts + (basicPersonalAmountCreditRate,)) < 0:
+    logging.error("Tax rates and Basic Personal Amounts cannot be below 0")
+    raise ValueError("Tax rates and Basic Personal Amounts cannot be below 0")
+
+  taxTable = compileBracketTable(taxBrackets)
+
+  taxTable["incomeTypes"] = {incomeType: i for i, incomeType in enumerate(incomeTaxRates)}
+  taxTable["incomeTypeRateBasisPoints"] = [toBasisPoints(rate) for rate in incomeTaxRates.values()]
+  taxTable["basicPersonalAmountIncomeCents"] = tuple(toCents(income) for income in basicPersonalAmountIncomes)
+  taxTable["basicPersonalAmountCents"] = tuple(toCents(personalAmount) for personalAmount in basicPersonalAmounts)
+  taxTable["basicPersonalAmountCreditBasisPoints"] = toBasisPoints(basicPersonalAmountCreditRate)
+
+  return taxTable
+
+def readTaxTableFile(year: int, jurisdiction: str) -> Dict[str, object]:
+  '''
+  Reads the tax table of a year and jurisdiction from its JSON file in taxTablesDir
+  
+  Reads the tax table, and converts its percentages to decimals (with percentageToDecimal) and the size of its last bracket to infinity, the same way they're used everywhere else. If there's no table for the year and jurisdiction, a ValueError will be raised.
+
+  Parameters
+  ----------
+  year : int
+    The tax year.
+  jurisdiction : str
+    The jurisdiction, like "federal" or "ontario".
+  
+  Returns
+  -------
+  dict[str, object]
+    The tax table, with the keys "incomeTaxRates", "taxBrackets", "basicPersonalAmountIncomes", "basicPersonalAmounts" and "basicPersonalAmountCreditRate".
+
+  Raises
+	------
+	TypeError
+		If year (int) or jurisdiction (str) is not the correct type
+	ValueError
+		If there is no tax table for the year and jurisdiction
+  '''
+  logging.info("Running readTaxTableFile(%s, '%s')", year, jurisdiction)
+
+  # Handle type exceptions
+  if not isinstance(year, int) or not isinstance(jurisdiction, str):
+    logging.error("year is not an int or jurisdiction is not a string")
+    raise TypeError("year is not an int or jurisdiction is not a string")
+
+  fname = os.path.join(taxTablesDir, f"{year}-{jurisdiction}.json")
+
+  # Handle value exceptions
+  if not os.path.isfile(fname):
+    logging.error("There is no tax table for %s %s", year, jurisdiction)
+    raise ValueError(f"There is no tax table for {year} {jurisdiction}")
+
+  with open(fname) as file:
+    taxTable = json.load(file)
+
+  basicPersonalAmount = taxTable["basicPersonalAmount"]
+
+  return {
+    "incomeTaxRates": {incomeType: percentageToDecimal(rate) for incomeType, rate in taxTable["incomeTaxRates"].items()},
+    "taxBrackets": [(float('inf') if size is None else size, percentageToDecimal(rate)) for size, rate in taxTable["taxBrackets"]],
+    "basicPersonalAmountIncomes": tuple(basicPersonalAmount["incomes"]),
+    "basicPersonalAmounts": tuple(basicPersonalAmount["amounts"]),
+    "basicPersonalAmountCreditRate": percentageToDecimal(basicPersonalAmount["creditRate"])
+  }
+
+@lru_cache(maxsize=None)
+def loadTaxTable(year: int, jurisdiction: str) -> str:
+  '''
+  Reads, compiles and registers the tax table of a year and jurisdiction
+  
+  The file is only read and compiled the first time each year and jurisdiction is loaded, after that the same table is used. The table is registered under a name like "2021-federal", which is what getBracketTable will load on its own, so the name can be passed straight to any of the tax functions.
+
+  Parameters
+  ----------
+  year : int
+    The tax year.
+  jurisdiction : str
+    The jurisdiction, like "federal" or "ontario".
+  
+  Returns
+  -------
+  str
+    The name the table is registered under.
+
+  Raises
+	------
+	TypeError
+		If year (int) or jurisdiction (str) is not the correct type
+	ValueError
+		If there is no tax table for the year and jurisdiction, or it has a rate or amount below 0
+  '''
+  name = f"{year}-{jurisdiction}"
+  bracketTables[name] = compileTaxTable(**readTaxTableFile(year, jurisdiction))
+  forgetCompiledTables(name)
+
+  return name
+
+def forgetCompiledTables(name: str) -> None:
+  '''
+  Throws out the tables compiled from a bracket table that was just registered (or replaced), so they're compiled again the next time they're used.
+  '''
+  afterTaxTables.pop(name, None)
+
+  # Combined tables made from the old table are out of date too, along with their after-tax tables
+  for combinedName in [tableName for tableName in bracketTables if "+" in tableName and name in tableName.split("+")]:
+    del bracketTables[combinedName]
+    afterTaxTables.pop(combinedName, None)
+
+# Compiled bracket tables that getTotalIncomeTax can use, by name
+bracketTables = {}
+
+def registerBracketTable(name: str, brackets: List[Tuple[float, float]]) -> None:
+  '''
+  Compiles a list of tax brackets and saves it under a name
+  
+  Compiles a list of tax brackets with compileBracketTable, and saves it so it can be used by name in getTotalIncomeTax and getTotalIncomeTaxBatch (for example, for another year or a province). A table that already has the name is replaced. If the name is empty, a ValueError will be raised.
+
+  Parameters
+  ----------
+  name : str
+    The name to save the table under.
+  brackets : list[tuple[float, float]]
+    The size of each bracket and the rate (as a decimal) charged on it, from the lowest bracket to the highest.
+
+  Raises
+	------
+	TypeError
+		If name (str) or brackets (list[tuple[float, float]]) is not the correct type
+	ValueError
+		If name is empty, there are no brackets, or a bracket size or rate is below 0
+  '''
+  logging.info("Running registerBracketTable('%s', %s)", name, brackets)
+
+  # Handle type exceptions
+  if not isinstance(name, str):
+    logging.error("name is not a string")
+    raise TypeError("name is not a string")
+
+  # Handle value exceptions
+  if name == "":
+    logging.error("name cannot be empty")
+    raise ValueError("name cannot be empty")
+
+  # Only the brackets, with no income types or BPA
+  bracketTables[name] = compileTaxTable({}, brackets)
+
+  # The after-tax and combined tables made from the old brackets are out of date
+  forgetCompiledTables(name)
+
+# After-tax tables compiled from the bracket tables, by name (see getAfterTaxTable)
+afterTaxTables = {}
+
+@lru_cache(maxsize=None)
+def getDefaultTaxTable() -> Dict[str, object]:
+  # The default year's federal rates, brackets and BPA (which the program asks about), read the first time they're needed
+  return readTaxTableFile(defaultTaxYear, defaultJurisdiction)
+
+# Tables named like "2022-federal" are loaded the first time they're used
+taxTableNamePattern = re.compile(r"(\d{4})-(\w+)")
+
+def getBracketTable(name: str) -> Dict[str, List[int]]:
+  # Look up a registered table (loading it from its file if there is one), with the same error as an unknown income type
+  if name not in bracketTables:
+    # The default year's federal table is always available as "federal"
+    if name == "federal":
+      bracketTables["federal"] = bracketTables[loadTaxTable(defaultTaxYear, defaultJurisdiction)]
+    elif (nameMatch := taxTableNamePattern.fullmatch(name)) and os.path.isfile(os.path.join(taxTablesDir, f"{name}.json")):
+      loadTaxTable(int(nameMatch[1]), nameMatch[2])
+    # Names like "2021-federal+2021-ontario" are combined from the tables in them
+    elif "+" in name:
+      combineTaxTables(name.split("+"))
+
+  if name not in bracketTables:
+    logging.error("Bracket table '%s' has not been registered", name)
+    raise ValueError(f"Bracket table '{name}' has not been registered")
+
+  return bracketTables[name]
+
+def getTotalIncomeTax(taxableIncome: Union[int, float], bracketTableName: str = "federal") -> float:
+  '''
+  Gets the total amount of income tax charged on a certain amount of taxable income
+  
+  Gets the total amount of income tax charged on a certain amount of taxable income. If the income amount is smaller than 0, or the bracket table has not been registered, a ValueError will be raised. Otherwise, the total income tax will be returned. Combined tables (like "2021-federal+2021-ontario") already have every table's BPA credit taken off, so for them this is the tax after the credits (see getCombinedIncomeTax).
+
+  Parameters
+  ----------
+  taxableIncome : int or float
+    The amount of taxable income.
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
+  
+  Returns
+  -------
+  float
+    The total amount of income tax charged on the given amount of taxable income (rounded to the nearest cent first), excluding deductions (except the BPA credits of a combined table). It's worked out exactly, so it can have fractions of a cent (like 9539.165), down to a millionth of a dollar.
+
+  Raises
+	------
+	TypeError
+		If taxableIncome (int, float) is not the correct type
+	ValueError
+		If the amount of taxable income is below 0 or not a finite number, or the bracket table has not been registered
+  '''
+  logging.info("Running getTotalIncomeTax(%s, '%s')", taxableIncome, bracketTableName)
+
+  # Handle type exceptions
+  if not isinstance(taxableIncome, (float, int)):
+    logging.error("taxableIncome is not an int or float")
+    raise TypeError("taxableIncome is not an int or float")
+
+  # Handle value exceptions
+  if taxableIncome < 0:
+    logging.error("taxableIncome cannot be below 0")
+    raise ValueError("taxableIncome cannot be below 0")
+
+  incomeTax = unitsToDollars(getIncomeTaxUnits(toCents(taxableIncome), bracketTableName))
+
+  if rootLogger.isEnabledFor(logging.INFO):
+    logging.info("Income tax calculated from getTotalIncomeTax: %s", incomeTax)
+  
+  return incomeTax
+
+def getIncomeTaxUnits(incomeCents: int, bracketTableName: str = "federal", applyBasicPersonalAmount: bool = False) -> int:
+  '''
+  Gets the exact income tax on an amount of income in cents
+  
+  Gets the income tax on an amount of taxable income given in cents, in millionths of a dollar, using only whole numbers so it's exact for any amount. This is what getTotalIncomeTax uses, without any type checks.
+
+  Parameters
+  ----------
+  incomeCents : int
+    The amount of taxable income, in cents.
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
+  applyBasicPersonalAmount : bool
+    Whether to take off the Basic Personal Amount credit (never dropping below 0).
+  
+  Returns
+  -------
+  int
+    The income tax, in millionths of a dollar.
+
+  Raises
+	------
+	ValueError
+		If the bracket table has not been registered
+  '''
+  bracketTable = getBracketTable(bracketTableName)
+  
+  # Find the bracket the income ends in, everything below it is already added up in its base tax
+  i = bisect_right(bracketTable["thresholdCents"], incomeCents) - 1
+  bracketTaxUnits = bracketTable["rateBasisPoints"][i] * (incomeCents - bracketTable["thresholdCents"][i])
+  incomeTaxUnits = bracketTable["baseTaxUnits"][i] + bracketTaxUnits
+
+  # There's a line for every call, so this can be sampled
+  if rootLogger.isEnabledFor(logging.INFO):
+    logging.info("Bracket %d: %s", i + 1, unitsToDollars(bracketTaxUnits), extra={"sampled": True})
+
+  if applyBasicPersonalAmount:
+    creditUnits = getBasicPersonalAmountCents(incomeCents, bracketTableName) * bracketTable["basicPersonalAmountCreditBasisPoints"]
+    incomeTaxUnits = max(incomeTaxUnits - creditUnits, 0)
+
+  return incomeTaxUnits
+
+def getBasicPersonalAmountCents(incomeCents: int, bracketTableName: str = "federal") -> int:
+  '''
+  Same as getBasicPersonalAmount, with the income and the Basic Personal Amount in cents.
+  '''
+  bracketTable = getBracketTable(bracketTableName)
+  basicPersonalAmountIncomeCents = bracketTable["basicPersonalAmountIncomeCents"]
+  basicPersonalAmountCents = bracketTable["basicPersonalAmountCents"]
+
+  if incomeCents <= basicPersonalAmountIncomeCents[0]:
+    return basicPersonalAmountCents[0]
+  elif incomeCents >= basicPersonalAmountIncomeCents[1]:
+    return basicPersonalAmountCents[1]
+
+  return sum(basicPersonalAmountCents) // 2
+
+def getBasicPersonalAmount(taxableIncome: Union[int, float], bracketTableName: str = "federal") -> float:
+  '''
+  Gets the Basic Personal Amount for a certain amount of taxable income
+  
+  Gets the Basic Personal Amount (BPA) that can be claimed on a certain amount of taxable income. If the income amount is smaller than 0, a ValueError will be raised. Otherwise, the BPA will be returned.
+
+  Parameters
+  ----------
+  taxableIncome : int or float
+    The amount of taxable income.
+  bracketTableName : str
+    The name of the tax table to get the BPA from, the federal one by default.
+  
+  Returns
+  -------
+  float
+    The Basic Personal Amount for the given amount of taxable income.
+
+  Raises
+	------
+	TypeError
+		If taxableIncome (int, float) is not the correct type
+	ValueError
+		If the amount of taxable income is below 0 or not a finite number, or the tax table has not been registered
+  '''
+  logging.info("Running getBasicPersonalAmount(%s, '%s')", taxableIncome, bracketTableName)
+
+  # Handle type exceptions
+  if not isinstance(taxableIncome, (float, int)):
+    logging.error("taxableIncome is not an int or float")
+    raise TypeError("taxableIncome is not an int or float")
+
+  # Handle value exceptions
+  if taxableIncome < 0:
+    logging.error("taxableIncome cannot be below 0")
+    raise ValueError("taxableIncome cannot be below 0")
+
+  # Federal Worksheet doesn't tell you what the basic personal amount is for incomes between 151K and 216K, just tells you to "use the federal worksheet"...
+  # Due to that, this is probably incorrect, as getBasicPersonalAmountCents just uses an average between the two. 
+  return getBasicPersonalAmountCents(toCents(taxableIncome), bracketTableName) / 100
+
+def getIncomeTaxAfterBasicPersonalAmount(taxableIncome: Union[int, float], bracketTableName: str = "federal") -> float:
+  '''
+  Gets the total amount of income tax charged after the Basic Personal Amount credit
+  
+  Gets the income tax on an amount of taxable income, and takes off the Basic Personal Amount credited at the non-refundable tax credit rate, the same way as getTotalIncomeTax and getBasicPersonalAmount. The income tax never drops below 0. If the income amount is smaller than 0, a ValueError will be raised.
+
+  Parameters
+  ----------
+  taxableIncome : int or float
+    The amount of taxable income.
+  bracketTableName : str
+    The name of the tax table to use, the federal one by default.
+  
+  Returns
+  -------
+  float
+    The total amount of income tax charged after the Basic Personal Amount credit.
+
+  Raises
+	------
+	TypeError
+		If taxableIncome is not an int or a float
+	ValueError
+		If taxableIncome is below 0 or not a finite number, or the tax table has not been registered
+  '''
+  logging.info("Running getIncomeTaxAfterBasicPersonalAmount(%s, '%s')", taxableIncome, bracketTableName)
+
+  # Handle type exceptions
+  if not isinstance(taxableIncome, (float, int)):
+    logging.error("taxableIncome is not an int or float")
+    raise TypeError("taxableIncome is not an int or float")
+
+  # Handle value exceptions
+  if taxableIncome < 0:
+    logging.error("taxableIncome cannot be below 0")
+    raise ValueError("taxableIncome cannot be below 0")
+
+  incomeTax = unitsToDollars(getIncomeTaxUnits(toCents(taxableIncome), bracketTableName, True))
+  logging.info("Total amount of income tax after the Basic Personal Amount: %s", incomeTax)
+
+  return incomeTax
+
+def getCombinedIncomeTax(taxableIncome: Union[int, float], bracketTableNames: List[str]) -> float:
+  '''
+  Gets the total income tax of several tax tables after each of their Basic Personal Amount credits
+  
+  Adds up the income tax after the BPA credit of every table (like federal and provincial tax), with one lookup in their combined table (see combineTaxTables). This is the same as getTotalIncomeTax and getIncomeTaxAfterBasicPersonalAmount with the combined table's name, which already has the credits taken off. If the income amount is smaller than 0, a ValueError will be raised.
+
+  Parameters
+  ----------
+  taxableIncome : int or float
+    The amount of taxable income.
+  bracketTableNames : list[str]
+    The names of the tables to add up, like ["2021-federal", "2021-ontario"].
+  
+  Returns
+  -------
+  float
+    The total amount of income tax charged by all of the tables, after each of their BPA credits.
+
+  Raises
+	------
+	TypeError
+		If taxableIncome is not an int or a float
+	ValueError
+		If taxableIncome is below 0 or not a finite number, there are no tables, or a table has not been registered
+  '''
+  logging.info("Running getCombinedIncomeTax(%s, %s)", taxableIncome, bracketTableNames)
+
+  # Handle value exceptions
+  if len(bracketTableNames) == 0:
+    logging.error("bracketTableNames cannot be empty")
+    raise ValueError("bracketTableNames cannot be empty")
+
+  return getIncomeTaxAfterBasicPersonalAmount(taxableIncome, "+".join(bracketTableNames))
+
+def getTaxBreakpoints(bracketTableName: str = "federal") -> List[int]:
+  '''
+  Gets the incomes (in cents) where the income tax after the BPA credit stops being one straight line
+  
+  The income tax after the BPA credit is a straight line between the start of each bracket, where the BPA changes, and the first cent where the tax goes over the BPA credit (before that, the credit covers all of it).
+
+  Parameters
+  ----------
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
+  
+  Returns
+  -------
+  list[int]
+    Where each straight line starts, in cents, from lowest to highest (starting with 0).
+
+  Raises
+	------
+	ValueError
+		If the bracket table has not been registered
+  '''
+  bracketTable = getBracketTable(bracketTableName)
+
+  # The BPA is lower from the cent after the first income, and lowest from the second one
+  basicPersonalAmountIncomeCents = bracketTable["basicPersonalAmountIncomeCents"]
+  stepCents = sorted(set(bracketTable["thresholdCents"]) | {basicPersonalAmountIncomeCents[0] + 1, basicPersonalAmountIncomeCents[1]})
+
+  # Between those, the tax goes over the credit at most once, from the first cent where it's covered no longer
+  breakpointCents = []
+  for stepIdx, stepStart in enumerate(stepCents):
+    breakpointCents.append(stepStart)
+
+    creditUnits = getBasicPersonalAmountCents(stepStart, bracketTableName) * bracketTable["basicPersonalAmountCreditBasisPoints"]
+    taxUnits = getIncomeTaxUnits(stepStart, bracketTableName)
+    rateBasisPoints = bracketTable["rateBasisPoints"][bisect_right(bracketTable["thresholdCents"], stepStart) - 1]
+
+    if taxUnits < creditUnits and rateBasisPoints > 0:
+      crossingCents = stepStart - (taxUnits - creditUnits) // rateBasisPoints
+      if stepIdx + 1 == len(stepCents) or crossingCents < stepCents[stepIdx + 1]:
+        breakpointCents.append(crossingCents)
+
+  return breakpointCents
+
+def compileCombinedTable(bracketTableNames: List[str]) -> Dict[str, object]:
+  '''
+  Combines the tax and BPA credits of several tax tables into one table
   
-  Obtain valid input from the user by repeatedly asking until their input is verified by a checker function. The input from the user will be returned.
+  Adds up the income tax after the BPA credit of each table (like federal and provincial tax) into one table in the same format as compileTaxTable, so the total takes one lookup instead of one per table. Every table's tax after its credit is a straight line between its breakpoints (from getTaxBreakpoints), so the total is a straight line between all of them. Each line starts at the exact total there (the total drops a little where a BPA gets smaller), with a rate (in basis points) of all the tables still charging tax. The credits are already taken off, so the combined table has no BPA of its own. Income types come from the first table.
 
   Parameters
   ----------
-  inpStr : str
-    The prompt shown to the user before collecting input.
-  incorrectNote: str
-    The prompt shown to the user when their input is invalid.
-  checker: Callable[str, bool]
-    A checker function that takes in the input string and returns a boolean depending on whether the input is valid or not
+  bracketTableNames : list[str]
+    The names of the tables to combine (registered with registerBracketTable, or loaded by name).
+  
+  Returns
+  -------
+  dict[str, object]
+    The combined table, with the same keys as compileTaxTable.
+
+  Raises
+	------
+	ValueError
+		If there are no tables, or a table has not been registered
+  '''
+  logging.info("Running compileCombinedTable(%s)", bracketTableNames)
+
+  # Handle value exceptions
+  if len(bracketTableNames) == 0:
+    logging.error("bracketTableNames cannot be empty")
+    raise ValueError("bracketTableNames cannot be empty")
+
+  def getChargingRate(incomeCents: int, bracketTableName: str) -> int:
+    # The rate of the bracket, unless the BPA credit still covers all of the tax (until the next breakpoint)
+    bracketTable = getBracketTable(bracketTableName)
+    creditUnits = getBasicPersonalAmountCents(incomeCents, bracketTableName) * bracketTable["basicPersonalAmountCreditBasisPoints"]
+    if getIncomeTaxUnits(incomeCents, bracketTableName) < creditUnits:
+      return 0
+
+    return bracketTable["rateBasisPoints"][bisect_right(bracketTable["thresholdCents"], incomeCents) - 1]
+
+  thresholdCents = []
+  baseTaxUnits = []
+  rateBasisPoints = []
+
+  for start in sorted(set(itertools.chain.from_iterable(getTaxBreakpoints(bracketTableName) for bracketTableName in bracketTableNames))):
+    baseTax = sum(getIncomeTaxUnits(start, bracketTableName, True) for bracketTableName in bracketTableNames)
+    rate = sum(getChargingRate(start, bracketTableName) for bracketTableName in bracketTableNames)
+
+    # Skip breakpoints where the last line just keeps going
+    if thresholdCents and rate == rateBasisPoints[-1] and baseTax == baseTaxUnits[-1] + rate * (start - thresholdCents[-1]):
+      continue
+
+    thresholdCents.append(start)
+    baseTaxUnits.append(baseTax)
+    rateBasisPoints.append(rate)
+
+  logging.info("Combined bracket thresholds (cents): %s, rates (basis points): %s", thresholdCents, rateBasisPoints)
+
+  firstTable = getBracketTable(bracketTableNames[0])
+  return {
+    "thresholdCents": thresholdCents,
+    "baseTaxUnits": baseTaxUnits,
+    "rateBasisPoints": rateBasisPoints,
+    "incomeTypes": firstTable["incomeTypes"],
+    "incomeTypeRateBasisPoints": firstTable["incomeTypeRateBasisPoints"],
+    "basicPersonalAmountIncomeCents": (0, 0),
+    "basicPersonalAmountCents": (0, 0),
+    "basicPersonalAmountCreditBasisPoints": 0
+  }
+
+def combineTaxTables(bracketTableNames: List[str]) -> str:
+  '''
+  Combines several tax tables with compileCombinedTable, and registers the result
+  
+  The combined table is registered under the names of the tables joined with "+" (like "2021-federal+2021-ontario"), which is also what getBracketTable will combine on its own, so the name can be passed straight to any of the tax functions.
+
+  Parameters
+  ----------
+  bracketTableNames : list[str]
+    The names of the tables to combine.
   
   Returns
   -------
   str
-    The input from the user.
+    The name the combined table is registered under.
 
   Raises
 	------
-	TypeError
-		If inpStr (str), incorrectNote (str), or checker (Callable[[str], bool]) is not the correct type
+	ValueError
+		If there are no tables, or a table has not been registered
   '''
+  name = "+".join(bracketTableNames)
+  bracketTables[name] = compileCombinedTable(bracketTableNames)
+  forgetCompiledTables(name)
 
-  logging.info(f"Running requireValidInput('{inpStr}', '{incorrectNote}', checker callable)")
+  return name
 
-  # Handle type errors
-  if not isinstance(inpStr, str):
-    logging.error("inpStr is not a string")
-    raise TypeError("inpStr is not a string")
-  elif not isinstance(incorrectNote, str):
-    logging.error("incorrectNote is not a string")
-    raise TypeError("incorrectNote is not a string")
-  elif not callable(checker):
-    logging.error("checker is not callable")
-    raise TypeError("checker is not a callable")
+def compileAfterTaxTable(bracketTableName: str = "federal") -> Dict[str, List[int]]:
+  '''
+  Compiles a bracket table and the BPA credit into straight-line pieces of after-tax income
+  
+  After-tax income (taxable income minus the income tax after the BPA credit) is a straight line between a few incomes: the start of each bracket, where the BPA changes, and where the tax first goes over the BPA credit. Because the BPA gets smaller at higher incomes, after-tax income drops a little at those points, so the highest after-tax income seen up to the end of each piece is also kept. Incomes are in cents and after-tax income is in millionths of a dollar, so everything is exact.
 
-  # Only exit once checker confirms
-  while not checker(result := input(inpStr)):
-    logging.debug("User did not provide proper input, reprompting.")
-    print(incorrectNote)
-    print()
+  Parameters
+  ----------
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
+  
+  Returns
+  -------
+  dict[str, list[int]]
+    The compiled table, with the keys "startCents" (where each piece starts), "startUnits" (the after-tax income there), "slopeUnits" (how much the after-tax income goes up per cent) and "runningMaxEndUnits" (the highest after-tax income up to the end of each piece, except the last one, which never ends).
 
-  logging.info(f"Final result from requireValidInput: {result}")
+  Raises
+	------
+	ValueError
+		If the bracket table has not been registered
+  '''
+  def getAfterTaxUnits(incomeCents: int) -> int:
+    return incomeCents * 10000 - getIncomeTaxUnits(incomeCents, bracketTableName, True)
+
+  startCents = getTaxBreakpoints(bracketTableName)
+  startUnits = [getAfterTaxUnits(start) for start in startCents]
+  slopeUnits = [getAfterTaxUnits(start + 1) - getAfterTaxUnits(start) for start in startCents]
+
+  # Each piece ends on the cent before the next one starts
+  runningMaxEndUnits = []
+  for nextStart in startCents[1:]:
+    endUnits = getAfterTaxUnits(nextStart - 1)
+    runningMaxEndUnits.append(max(runningMaxEndUnits[-1], endUnits) if runningMaxEndUnits else endUnits)
+
+  logging.info("Compiled after-tax pieces starting at (cents): %s", startCents)
+
+  return {"startCents": startCents, "startUnits": startUnits, "slopeUnits": slopeUnits, "runningMaxEndUnits": runningMaxEndUnits}
+
+def getAfterTaxTable(bracketTableName: str = "federal") -> Dict[str, List[int]]:
+  # Only compiled the first time it's needed for each bracket table
+  if bracketTableName not in afterTaxTables:
+    afterTaxTables[bracketTableName] = compileAfterTaxTable(bracketTableName)
+
+  return afterTaxTables[bracketTableName]
+
+def getGrossIncomeCents(afterTaxUnits: int, bracketTableName: str = "federal") -> int:
+  '''
+  Gets the smallest taxable income in cents that leaves an amount of after-tax income
   
-  return result
+  Finds the first piece of the after-tax table that reaches the after-tax income, and works backwards along its straight line to the first cent that's enough, without any guessing.
 
-def percentageToDecimal(percentage: Union[int, float]) -> float:
+  Parameters
+  ----------
+  afterTaxUnits : int
+    The after-tax income wanted, in millionths of a dollar.
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
+  
+  Returns
+  -------
+  int
+    The smallest taxable income, in cents, with at least that much after-tax income.
+
+  Raises
+	------
+	ValueError
+		If the bracket table has not been registered
   '''
-  Convert a percentage to a decimal value.
+  afterTaxTable = getAfterTaxTable(bracketTableName)
+
+  # The first piece that ever gets there (pieces that end lower after a drop are skipped)
+  i = bisect_left(afterTaxTable["runningMaxEndUnits"], afterTaxUnits)
+  shortfallUnits = afterTaxUnits - afterTaxTable["startUnits"][i]
+
+  if shortfallUnits <= 0:
+    return afterTaxTable["startCents"][i]
+
+  # Rounded up to the next whole cent
+  return afterTaxTable["startCents"][i] - (-shortfallUnits // afterTaxTable["slopeUnits"][i])
+
+def getGrossIncome(afterTaxIncome: Union[int, float], bracketTableName: str = "federal") -> float:
+  '''
+  Gets the taxable income needed to be left with an amount of after-tax income
   
-  Convert a percentage to a decimal value, given the percentage. If the percentage is smaller than 0, a ValueError will be raised. Otherwise, a decimal representation of the given percentage will be returned.
+  Gets the smallest amount of taxable income (to the cent) that's left with at least the given amount after income tax and the Basic Personal Amount credit, the reverse of getIncomeTaxAfterBasicPersonalAmount. If the after-tax income is smaller than 0, a ValueError will be raised.
 
   Parameters
   ----------
-  percentage : int or float
-    The percentage to convert.
+  afterTaxIncome : int or float
+    The amount of income wanted after income tax.
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
   
   Returns
   -------
   float
-    A decimal representation of the given percentage, rounded to 5 decimal points.
+    The smallest amount of taxable income with at least that much left after income tax.
 
   Raises
 	------
 	TypeError
-		If percentage (int, float) is not the correct type
+		If afterTaxIncome is not an int or a float
 	ValueError
-		If percentage is smaller than 0
+		If afterTaxIncome is below 0 or not a finite number, or the bracket table has not been registered
   '''
-  
-  logging.info(f"Running percentageToDecimal({percentage})")
+  logging.info("Running getGrossIncome(%s, '%s')", afterTaxIncome, bracketTableName)
 
-  # Handle type errors
-  if not isinstance(percentage, (int, float)):
-    logging.error("Percentage parameter is not an int or float")
-    raise TypeError("Percentage parameter is not an int or float")
+  # Handle type exceptions
+  if not isinstance(afterTaxIncome, (float, int)):
+    logging.error("afterTaxIncome is not an int or float")
+    raise TypeError("afterTaxIncome is not an int or float")
 
-  # Handle value errors
-  if percentage < 0:
-    logging.error("Percentage cannot be below 0%")
-    raise ValueError("Percentage cannot be below 0%")
+  # Handle value exceptions
+  if afterTaxIncome < 0:
+    logging.error("afterTaxIncome cannot be below 0")
+    raise ValueError("afterTaxIncome cannot be below 0")
 
-  # Convert percentage to decimal
-  decimalValue = percentage / 100
+  grossIncome = getGrossIncomeCents(toCents(afterTaxIncome) * 10000, bracketTableName) / 100
+  logging.info("Gross income calculated from getGrossIncome: %s", grossIncome)
 
-  logging.info(f"Decimal value of percentage: {decimalValue}")
+  return grossIncome
 
-  logging.debug(f"Returning decimal value of percentage rounded to 5 decimal points...")
+def getTotalIncomeTaxBatch(taxableIncomes, applyBasicPersonalAmount: bool = True, bracketTableName: str = "federal"):
+  '''
+  Gets the total amount of income tax charged on many amounts of taxable income at once
   
-  return round(decimalValue, 5)
+  Gets the total amount of income tax charged on every amount of taxable income in an array, using NumPy instead of going through them one at a time. The results match getTotalIncomeTax (and the BPA credit, if applied) exactly. If any income amount is smaller than 0, a ValueError will be raised.
 
-# All the tax rates depending on type of income. 
-# Taken from CRA's website.
-# Value represents the tax rate as a decimal between 0 and 1
-incomeTaxRates = {
-  "Employment":                             percentageToDecimal(100),
-  "Self-Employment":                        percentageToDecimal(100),
-  "Eligible Dividends":                     percentageToDecimal(100),
-  "Ineligible Dividends":                   percentageToDecimal(100),
-  "Taxable Scholarships":                   percentageToDecimal(100),
-  "Non-taxable Scholarships":               percentageToDecimal(0),
-  "Rental Income":                          percentageToDecimal(38),
-  "Capital Gains":                          percentageToDecimal(50),
-  "Lottery Winnings":                       percentageToDecimal(0),
-  "Gifts":                                  percentageToDecimal(0),
-  "Inheritance":                            percentageToDecimal(0),
-  "Other Taxable Income (EI, CERB, etc.)":  percentageToDecimal(100),
-  "Other Non-Taxable Income":               percentageToDecimal(0)
-}
+  Parameters
+  ----------
+  taxableIncomes : array_like of int or float
+    The amounts of taxable income.
+  applyBasicPersonalAmount : bool
+    Whether to take off the Basic Personal Amount credit (never dropping below 0). Combined tables have their credits taken off either way.
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
+  
+  Returns
+  -------
+  numpy.ndarray
+    The total amount of income tax charged on each amount of taxable income.
+
+  Raises
+	------
+	ImportError
+		If NumPy is not installed
+	TypeError
+		If taxableIncomes is not made of ints or floats
+	ValueError
+		If any amount of taxable income is below 0, or the bracket table has not been registered
+  '''
+  np = importNumPy()
+  incomeCents = getIncomeCentsBatch(taxableIncomes, "getTotalIncomeTaxBatch")
+  incomeTaxes = (getIncomeTaxUnitsBatch(incomeCents, bracketTableName, applyBasicPersonalAmount) / unitsPerDollar).astype(np.float64)
 
-# All of the federal tax brackets 
-# Taken from CRA's website
-# First value represents the max amount for the bracket
-# Second value represents the amount of tax on that bracket
-taxBrackets = [
-  (49020,        percentageToDecimal(15)),      # First tax bracket:  15%   on income $49,020   or  less
-  (98040,        percentageToDecimal(20.5)),    # Second tax bracket: 20.5% on income $49,020   to  $98,040
-  (151978,       percentageToDecimal(26)),      # Third tax bracket:  26%   on income $98,040   to  $151,978
-  (216511,       percentageToDecimal(29)),      # Fourth tax bracket: 29%   on income $151,978  to  $216,511
-  (float('inf'), percentageToDecimal(33))       # Fifth tax bracket:  33%   on income more than     $216,511
-]
+  if rootLogger.isEnabledFor(logging.INFO):
+    logging.info("Total income tax calculated from getTotalIncomeTaxBatch: %s", incomeTaxes.sum())
 
-def getTaxableAmount(incomeType: str, amount: Union[int, float]) -> Tuple[float, float]:
+  return incomeTaxes
+
+def getIncomeCentsBatch(taxableIncomes, functionName: str):
   '''
-  Gets the taxable amount of income given the type and amount
+  Checks an array of taxable incomes for the batch functions, and converts it to cents
   
-  Determines the taxable amount of income, given the type of income, and the amount of income. If the income amount is smaller than 0, or the income type is not a key in incomeTaxRates, a ValueError will be raised. Otherwise, the tax rate and taxed amount will be returned in a tuple.
-
   Parameters
   ----------
-  incomeType : str
-    The type of income. The value must be a key in incomeTaxRates.
-  amount : int or float
-    The amount of this type of income.
+  taxableIncomes : array_like of int or float
+    The amounts of taxable income.
+  functionName : str
+    The name of the batch function being run, for the log and error messages.
   
   Returns
   -------
-  tuple[float, float]
-    A tuple including the taxable percentage and taxable amount, respectively.
+  numpy.ndarray
+    The amounts of taxable income, in cents (as Python whole numbers if any are too large for 64-bit ones).
 
   Raises
 	------
+	ImportError
+		If NumPy is not installed
 	TypeError
-		If incomeType (str) or amount (int, float) is not the correct type
+		If taxableIncomes is not made of ints or floats
 	ValueError
-		If incomeType is empty, not a key in incomeTaxRates, or the amount of income is below 0
+		If any amount of taxable income is below 0 or not a finite number
   '''
+  np = importNumPy()
+  if np is None:
+    logging.error("NumPy is needed for %s", functionName)
+    raise ImportError(f"NumPy is needed for {functionName}")
 
-  logging.info(f"Running getTaxableAmount('{incomeType}', {amount})")
+  incomes = np.asarray(taxableIncomes)
+  logging.info("Running %s on %d incomes", functionName, incomes.size)
 
   # Handle type exceptions
-  if not isinstance(incomeType, str):
-    logging.error("incomeType is not a string")
-    raise TypeError("incomeType is not a string")
+  if incomes.dtype.kind not in "iuf":
+    logging.error("taxableIncomes is not made of ints or floats")
+    raise TypeError("taxableIncomes is not made of ints or floats")
 
-  if not isinstance(amount, (float, int)):
-    logging.error("amount is not an int or float")
-    raise TypeError("amount is not an int or float")
+  incomes = incomes.astype(np.float64)
 
   # Handle value exceptions
-  if amount < 0:
-    logging.error("amount of income cannot be below 0")
-    raise ValueError("amount of income cannot be below 0")
+  with np.errstate(over="ignore"):
+    isCountable = np.isfinite(incomes * 100).all()
+  if not isCountable:
+    logging.error("taxableIncomes must be finite numbers small enough to count in cents")
+    raise ValueError("taxableIncomes must be finite numbers small enough to count in cents")
 
-  if incomeType == "":
-    logging.error("incomeType cannot be empty")
-    raise ValueError("incomeType cannot be empty")
+  if (incomes < 0).any():
+    logging.error("taxableIncomes cannot have amounts below 0")
+    raise ValueError("taxableIncomes cannot have amounts below 0")
 
-  # Only attempt to get the tax rate if the income type is recorded
-  if incomeType in incomeTaxRates:
-    taxRate = incomeTaxRates[incomeType]
-    logging.info(f"Tax rate for {incomeType}: {taxRate}")
-    
-    taxedAmount = taxRate * amount
-    logging.info(f"Taxable amount: {taxedAmount}")
-    
-    return taxRate, taxedAmount
-  else:
-    logging.error("Income type does not exist in incomeTaxRates when running getTaxableAmount")
-    raise ValueError("Income type does not exist in incomeTaxRates when running getTaxableAmount")
+  # Amounts past 64-bit whole numbers are rounded one at a time into Python's whole numbers, the same way toCents does
+  if incomes.size and incomes.max() * 100 >= 2 ** 63:
+    return np.array([round(income * 100) for income in incomes.ravel().tolist()], dtype=object).reshape(incomes.shape)
+
+  return np.rint(incomes * 100).astype(np.int64)
 
-def getTotalIncomeTax(taxableIncome: Union[int, float]) -> float:
+# Largest income (in cents) the batch functions can tax with 64-bit whole numbers, leaving room for the highest rate
+maxBatchIncomeCents = (2 ** 63 - 1) // 10000
+
+def getIncomeTaxUnitsBatch(incomeCents, bracketTableName: str = "federal", applyBasicPersonalAmount: bool = False):
   '''
-  Gets the total amount of income tax charged on a certain amount of taxable income
+  Gets the exact income tax on many amounts of income in cents at once
   
-  Gets the total amount of income tax charged on a certain amount of taxable income. If the income amount is smaller than 0, or the income type is not a key in incomeTaxRates, a ValueError will be raised. Otherwise, the tax rate and taxed amount will be returned in a tuple.
+  Same as getIncomeTaxUnits, for a NumPy array of incomes in cents. Incomes too large for 64-bit whole numbers are worked out with Python's whole numbers instead, so they're still exact.
 
   Parameters
   ----------
-  taxableIncome : int or float
-    The amount of taxable income.
+  incomeCents : numpy.ndarray
+    The amounts of taxable income, in cents.
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
+  applyBasicPersonalAmount : bool
+    Whether to take off the Basic Personal Amount credit (never dropping below 0).
   
   Returns
   -------
-  float
-    The total amount of income tax charged on the given amount of taxable income, excluding deductions, rounded to 5 decimal points.
+  numpy.ndarray
+    The income tax on each income, in millionths of a dollar.
+
+  Raises
+	------
+	ValueError
+		If the bracket table has not been registered
+  '''
+  np = importNumPy()
+  bracketTable = getBracketTable(bracketTableName)
+
+  # Python whole numbers never overflow, they're just slower
+  intType = np.int64
+  if incomeCents.size and incomeCents.max() > maxBatchIncomeCents:
+    intType = object
+  incomeCents = incomeCents.astype(intType)
+
+  # Same as getIncomeTaxUnits: the base tax of the bracket each income ends in, plus the rate on the rest
+  thresholdCents = np.array(bracketTable["thresholdCents"], dtype=intType)
+  bracketIdxs = np.searchsorted(bracketTable["thresholdCents"], incomeCents, side="right") - 1
+  incomeTaxUnits = np.array(bracketTable["baseTaxUnits"], dtype=intType)[bracketIdxs] + \
+                   np.array(bracketTable["rateBasisPoints"], dtype=intType)[bracketIdxs] * (incomeCents - thresholdCents[bracketIdxs])
+
+  if applyBasicPersonalAmount:
+    personalAmountCents = getBasicPersonalAmountCentsBatch(incomeCents, bracketTableName).astype(intType)
+    incomeTaxUnits = np.maximum(incomeTaxUnits - personalAmountCents * bracketTable["basicPersonalAmountCreditBasisPoints"], 0)
+
+  return incomeTaxUnits
+
+def getBasicPersonalAmountCentsBatch(incomeCents, bracketTableName: str = "federal"):
+  '''
+  Same as getBasicPersonalAmountCents, for a NumPy array of incomes in cents.
+  '''
+  np = importNumPy()
+  bracketTable = getBracketTable(bracketTableName)
+  basicPersonalAmountIncomeCents = bracketTable["basicPersonalAmountIncomeCents"]
+  basicPersonalAmountCents = bracketTable["basicPersonalAmountCents"]
+
+  return np.where(incomeCents <= basicPersonalAmountIncomeCents[0], basicPersonalAmountCents[0],
+                  np.where(incomeCents >= basicPersonalAmountIncomeCents[1], basicPersonalAmountCents[1],
+                           sum(basicPersonalAmountCents) // 2))
+
+def getGrossIncomeBatch(afterTaxIncomes, bracketTableName: str = "federal"):
+  '''
+  Gets the taxable income needed to be left with many amounts of after-tax income at once
+  
+  Same as getGrossIncome, for every amount of after-tax income in an array, using NumPy. Each one only needs a binary search through the pieces of the after-tax table. If any after-tax income is smaller than 0, a ValueError will be raised.
+
+  Parameters
+  ----------
+  afterTaxIncomes : array_like of int or float
+    The amounts of income wanted after income tax.
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
+  
+  Returns
+  -------
+  numpy.ndarray
+    The smallest amount of taxable income with at least each amount left after income tax.
 
   Raises
 	------
+	ImportError
+		If NumPy is not installed
 	TypeError
-		If taxableIncome (int, float) is not the correct type
+		If afterTaxIncomes is not made of ints or floats
 	ValueError
-		If the amount of taxable income is below 0
+		If any amount of after-tax income is below 0, or the bracket table has not been registered
   '''
-  logging.info(f"Running getTaxableAmount({taxableIncome})")
+  np = importNumPy()
+  # The same checks as taxable incomes
+  targetCents = getIncomeCentsBatch(afterTaxIncomes, "getGrossIncomeBatch")
+  afterTaxTable = getAfterTaxTable(bracketTableName)
 
-  # Handle type exceptions
-  if not isinstance(taxableIncome, (float, int)):
-    logging.error("taxableIncome is not an int or float")
-    raise TypeError("taxableIncome is not an int or float")
+  # Python whole numbers never overflow, they're just slower
+  intType = np.int64
+  if targetCents.size and targetCents.max() > maxBatchIncomeCents:
+    intType = object
+  targetUnits = targetCents.astype(intType) * 10000
 
-  # Handle value exceptions
-  if taxableIncome < 0:
-    logging.error("taxableIncome cannot be below 0")
-    raise ValueError("taxableIncome cannot be below 0")
+  # Same as getGrossIncomeCents, for every amount at once
+  pieceIdxs = np.searchsorted(np.array(afterTaxTable["runningMaxEndUnits"], dtype=intType), targetUnits, side="left")
+  startCents = np.array(afterTaxTable["startCents"], dtype=intType)[pieceIdxs]
+  shortfallUnits = np.maximum(targetUnits - np.array(afterTaxTable["startUnits"], dtype=intType)[pieceIdxs], 0)
+  grossIncomeCents = startCents - (-shortfallUnits // np.array(afterTaxTable["slopeUnits"], dtype=intType)[pieceIdxs])
+
+  return (grossIncomeCents / 100).astype(np.float64)
+
+def getTaxCurves(taxableIncomes, bracketTableName: str = "federal") -> Dict[str, object]:
+  '''
+  Gets the income tax, effective rate, marginal rate and after-tax income for many amounts of taxable income at once
+  
+  Works out the brackets and the Basic Personal Amount credit for every amount of taxable income in an array at the same time, using NumPy, for seeing how tax changes as income goes up (like sweeping from $0 to $1M in $1 steps). The effective rate is the income tax after the BPA credit out of the taxable income, and the marginal rate is the rate on the next dollar earned (0 while the BPA credit still covers all of the tax). Combined tables already have their BPA credits taken off, so their "incomeTax" is the same as "incomeTaxAfterBPA". If any income amount is smaller than 0, a ValueError will be raised.
 
-  incomeTax = 0
+  Parameters
+  ----------
+  taxableIncomes : array_like of int or float
+    The amounts of taxable income.
+  bracketTableName : str
+    The name of the bracket table to use (registered with registerBracketTable), the federal brackets by default.
   
-  # Loop through each bracket
-  for i, (endOfBracket, rate) in enumerate(taxBrackets):
-    # Get the amount of income that can be taxed under this bracket
-    taxableIncomeUnderBracket = min(taxableIncome, endOfBracket)
+  Returns
+  -------
+  dict[str, numpy.ndarray]
+    The curves, with the keys "taxableIncome", "incomeTax", "incomeTaxAfterBPA", "afterTaxIncome", "effectiveRate" and "marginalRate". Rates are decimals.
+
+  Raises
+	------
+	ImportError
+		If NumPy is not installed
+	TypeError
+		If taxableIncomes is not made of ints or floats
+	ValueError
+		If any amount of taxable income is below 0, or the bracket table has not been registered
+  '''
+  np = importNumPy()
+  incomeCents = getIncomeCentsBatch(taxableIncomes, "getTaxCurves")
+  bracketTable = getBracketTable(bracketTableName)
+
+  # The brackets are only worked out once, the BPA credit is taken off after
+  incomeTaxUnits = getIncomeTaxUnitsBatch(incomeCents, bracketTableName)
+  creditUnits = getBasicPersonalAmountCentsBatch(incomeCents, bracketTableName) * bracketTable["basicPersonalAmountCreditBasisPoints"]
+  incomeTaxAfterBPAUnits = np.maximum(incomeTaxUnits - creditUnits, 0)
+
+  # The rate of the bracket each income ends in, unless the credit still covers everything
+  bracketIdxs = np.searchsorted(bracketTable["thresholdCents"], incomeCents, side="right") - 1
+  marginalRates = np.array(bracketTable["rateBasisPoints"])[bracketIdxs] / 10000
+  marginalRates[incomeTaxUnits < creditUnits] = 0
+
+  # Incomes too large for 64-bit whole numbers are worked out exactly, then turned back into floats like the rest
+  taxableIncomes = (incomeCents / 100).astype(np.float64)
+  incomeTaxesAfterBPA = (incomeTaxAfterBPAUnits / unitsPerDollar).astype(np.float64)
+  effectiveRates = np.divide(incomeTaxesAfterBPA, taxableIncomes, out=np.zeros(incomeCents.shape), where=taxableIncomes > 0)
+
+  return {
+    "taxableIncome": taxableIncomes,
+    "incomeTax": (incomeTaxUnits / unitsPerDollar).astype(np.float64),
+    "incomeTaxAfterBPA": incomeTaxesAfterBPA,
+    "afterTaxIncome": taxableIncomes - incomeTaxesAfterBPA,
+    "effectiveRate": effectiveRates,
+    "marginalRate": marginalRates
+  }
+
+def runSelfTests() -> None:
+  '''
+  Tests the functions using assertions
   
-    # Add to total income tax by multiplying the rate and amount of taxable income under this bracket
-    incomeTax += taxableIncomeUnderBracket * rate
-    
-    logging.info(f"Bracket {i+1}: {taxableIncomeUnderBracket * rate}")
-    
-    # Subtract the income tax already charged from taxableIncome so it's not double counted
-    taxableIncome -= taxableIncomeUnderBracket
+  Only run with "python main.py --verify", so importing this file stays fast. An AssertionError is raised for the first test that fails.
+  '''
+  logging.debug(f"Testing functions using assertions...")
+
+  # Assertions to test the percentageToDecimal function
+  assert percentageToDecimal(50) == 0.5, "50% is 0.5"
+  assert percentageToDecimal(25) == 0.25, "25% is 0.25"
+  assert percentageToDecimal(0.5) == 0.005, "0.5% is 0.005"
+  assert percentageToDecimal(83.9322) == 0.83932, "83.9322% rounded to 5 decimal points is 0.83932"
+  assert percentageToDecimal(43.2934) == 0.43293, "43.2934% rounded to 5 decimal points is 0.43293"
+  assert percentageToDecimal(10) == 0.1, "10% is 0.1"
+  assert percentageToDecimal(0.101) == 0.00101, "10% is 0.1"
+  assert percentageToDecimal(9.39) == 0.0939, "9.39% is 0.0939"
+
+  # Assertions to test the getTaxableAmount function
+  assert getTaxableAmount("Employment", 50000)[1] == 50000, "Employment income has a tax rate of 100%"
+  assert getTaxableAmount("Eligible Dividends", 50000)[1] == 50000, "Eligible dividends income has a tax rate of 100%"
+  assert getTaxableAmount("Capital Gains", 80000)[1] == 40000, "Capital gains income has a tax rate of 50%"
+  assert getTaxableAmount("Rental Income", 25394)[1] == 9649.72, "Rental income has a tax rate of 38%"
+  assert getTaxableAmount("Inheritance", 94203)[1] == 0, "Inheritance has a tax rate of 0%"
+  assert getTaxableAmount("Other Non-Taxable Income", 213123)[1] == 0, "Other Non-Taxable Income has a tax rate of 0%"
+  assert getTaxableAmount("Other Taxable Income (EI, CERB, etc.)", 1392)[1] == 1392, "Other Non-Taxable Income has a tax rate of 100%"
+  assert getTaxableAmount("Taxable Scholarships", 1030)[1] == 1030, "Taxable Scholarships have a tax rate of 100%"
+
+  # Assertions to test the getTotalIncomeTax function
+  assert getTotalIncomeTax(50000) == 7553.9, "Income tax on $50000 is $7553.9"
+  assert getTotalIncomeTax(0) == 0, "Income tax on $0 is $0"
+  assert getTotalIncomeTax(100000) == 17803.9, "Income tax on $100000 is $17803.9"
+  assert getTotalIncomeTax(394034) == 94514.32, "Income tax on $394034 is $94514.32"
+  assert getTotalIncomeTax(3039281928) == 1002922658.74, "Income tax on $3039281928, rounded to 5 decimal points, is $1002922658.74"
+  assert getTotalIncomeTax(1) == 0.15, "Income tax on $1 is $0.15"
+  assert getTotalIncomeTax(192032) == 39143.92, "Income tax on $192032 is $39143.92"
+  assert getTotalIncomeTax(250) == 37.5, "Income tax on $250 is $37.5"
+
+  # Assertions to test the compileBracketTable and registerBracketTable functions
+  assert compileBracketTable(getDefaultTaxTable()["taxBrackets"])["thresholdCents"] == [0, 4902000, 14706000, 29903800, 51554900], "Each bracket starts where the last one ended"
+  assert compileBracketTable(getDefaultTaxTable()["taxBrackets"])["baseTaxUnits"][1] == 7353 * unitsPerDollar, "The first bracket has $7353 of tax"
+  assert compileBracketTable([(10, 0.1), (float('inf'), 0.2)])["rateBasisPoints"] == [1000, 2000], "10% is 1000 basis points"
+  registerBracketTable("flat 10%", [(float('inf'), percentageToDecimal(10))])
+  assert getTotalIncomeTax(50000, "flat 10%") == 5000, "Income tax on $50000 at a flat 10% is $5000"
+  del bracketTables["flat 10%"]
+
+  # Assertions to test the tax tables
+  assert readTaxTableFile(2021, "federal")["taxBrackets"][-1] == (float('inf'), 0.33), "The last bracket never ends"
+  assert loadTaxTable(2022, "federal") == "2022-federal", "Tax tables are registered by year and jurisdiction"
+  assert getTotalIncomeTax(60000, "2022-federal") == 9539.165, "Income tax on $60000 in 2022 is $9539.165"
+  assert getBasicPersonalAmount(200000, "2022-federal") == 13558.5, "The BPA on $200000 in 2022 is the average, $13558.5"
+  assert getIncomeTaxAfterBasicPersonalAmount(60000, "2021-ontario") == 3089.738, "Ontario income tax on $60000 after its BPA credit is $3089.738"
+  assert getTaxableAmount("Capital Gains", 1000, "2022-federal")[1] == 500, "Capital gains income has a tax rate of 50% in 2022"
+
+  # Assertions to test the compileCombinedTable function
+  assert getCombinedIncomeTax(60000, ["2021-federal", "2021-ontario"]) == 10622.438, "Federal and Ontario tax on $60000 after both BPA credits is $7532.70 + $3089.738"
+  assert getTotalIncomeTax(60000, "2021-federal+2021-ontario") == 10622.438, "Combined tables already have both BPA credits taken off"
+  assert getBracketTable("2021-federal+2021-ontario")["thresholdCents"][:3] == [0, 1088000, 1380800], "Ontario tax goes over its BPA credit at $10880, and federal tax at $13808"
+  assert 15197801 in getBracketTable("2021-federal+2021-ontario")["thresholdCents"], "A new line starts on the cent the federal BPA gets smaller"
+  assert getGrossIncome(50000, "2021-federal+2021-ontario") == 60884.78, "$60884.78 is the least taxable income left with $50000 after federal and Ontario tax"
+
+  # Assertions to test that combined tables are combined again when one of their tables is replaced
+  registerBracketTable("flat rate", [(float('inf'), percentageToDecimal(10))])
+  getAfterTaxTable(combineTaxTables(["flat rate", "2021-ontario"]))
+  registerBracketTable("flat rate", [(float('inf'), percentageToDecimal(20))])
+  assert getCombinedIncomeTax(1000, ["flat rate", "2021-ontario"]) == 200, "Income tax on $1000 at a flat 20% (and no Ontario tax after its BPA credit) is $200"
+  assert getGrossIncome(800, "flat rate+2021-ontario") == 1000, "$1000 is left with $800 after a flat 20%"
+  del bracketTables["flat rate"]
+  forgetCompiledTables("flat rate")
+
+  # Assertions to test the getIncomeTaxUnits function
+  assert getIncomeTaxUnits(1) == 1500, "Income tax on 1 cent is 0.15 cents"
+  assert getIncomeTaxUnits(303928192800) == 1002922658740000, "Income tax on $3039281928 is exactly $1002922658.74"
+  assert getIncomeTaxUnits(5000000, applyBasicPersonalAmount=True) == 5482700000, "Income tax on $50000 after the BPA credit is $5482.70"
+
+  # Assertions to test the getIncomeTaxAfterBasicPersonalAmount function
+  assert getIncomeTaxAfterBasicPersonalAmount(50000) == 5482.7, "Income tax on $50000 after the BPA credit is $5482.70"
+  assert getIncomeTaxAfterBasicPersonalAmount(1000) == 0, "Income tax on $1000 is $0 after the BPA credit"
+  assert getIncomeTaxAfterBasicPersonalAmount(180000) == 34048.425, "The BPA credit on $180000 uses the average BPA, exactly"
+
+  # Assertions to test the getGrossIncome function
+  assert getGrossIncome(0) == 0, "No income is needed to be left with $0"
+  assert getGrossIncome(13808) == 13808, "The BPA credit covers all of the tax on $13808"
+  assert getGrossIncome(44517.3) == 50000, "$50000 is left with $44517.30 after tax"
+  assert getGrossIncome(44517.31) == 50000.02, "Each extra cent of taxable income is taxed at 20.5%"
+  assert getGrossIncome(1000000) == 1429491.57, "$1429491.57 is the least taxable income left with $1000000 after tax"
+  assert compileAfterTaxTable()["startCents"][:3] == [0, 1380800, 4902000], "The tax goes over the BPA credit at $13808"
+
+  # Assertions to test the getBasicPersonalAmount function
+  assert getBasicPersonalAmount(50000) == 13808, "The BPA on $50000 is $13808"
+  assert getBasicPersonalAmount(151978) == 13808, "The BPA on $151978 is $13808"
+  assert getBasicPersonalAmount(180000) == 13114.5, "The BPA on $180000 is the average, $13114.5"
+  assert getBasicPersonalAmount(216511) == 12421, "The BPA on $216511 is $12421"
+
+  # Assertions to test the getTotalIncomeTaxBatch function (only if NumPy is installed)
+  np = importNumPy()
+  if np is not None:
+    assert getTotalIncomeTaxBatch([50000, 0, 100000, 3039281928], False).tolist() == [7553.9, 0, 17803.9, 1002922658.74], "Batch income tax matches getTotalIncomeTax"
+    assert getTotalIncomeTaxBatch([1000, 50000])[0] == 0, "Income tax on $1000 is $0 after the BPA credit"
+    assert getTotalIncomeTaxBatch([50000])[0] == 5482.7, "Income tax on $50000 after the BPA credit is $5482.70"
+    assert getTaxCurves([0, 50000])["effectiveRate"].tolist() == [0, 0.109654], "The effective rate on $50000 is $5482.70 out of $50000"
+    assert getTaxCurves([1000, 50000, 200000])["marginalRate"].tolist() == [0, 0.205, 0.26], "The marginal rate is 0 while the BPA credit covers all of the tax"
+    assert getGrossIncomeBatch([0, 13808, 44517.3, 44517.31]).tolist() == [0, 13808, 50000, 50000.02], "Batch gross income matches getGrossIncome"
+    assert getGrossIncomeBatch([1e17]).tolist() == [getGrossIncome(1e17)], "Batch gross income matches getGrossIncome past 64-bit cents"
+    assert getIncomeTaxUnitsBatch(np.array([1, 303928192800, 10 ** 18])).tolist() == [1500, 1002922658740000, 3299999999959622500000], "Batch income tax is exact, even past 64 bits"
+    assert getTotalIncomeTaxBatch([1e17, 1e18], False).tolist() == [getTotalIncomeTax(1e17), getTotalIncomeTax(1e18)], "Batch income tax on incomes past 64-bit cents matches getTotalIncomeTax"
+
+  logging.debug(f"Done testing functions!")
+
+# How long importing this file may take in a fresh interpreter (NumPy and the tax tables aren't loaded until they're needed)
+importTimeBudget = 0.075
+
+def checkImportTime(runCount: int = 5) -> float:
+  '''
+  Measures how long importing this file takes, and checks that it has no side effects
   
-    # No more income to tax
-    if taxableIncome <= 0:
-      logging.debug(f"No more income to tax, exiting loop...")
-      break
+  Imports this file in a new interpreter a few times, and keeps the fastest time (the least affected by everything else going on). Importing must not set up logging, import NumPy or load a tax table.
+
+  Parameters
+  ----------
+  runCount : int
+    How many times to import this file.
+  
+  Returns
+  -------
+  float
+    The fastest import time, in seconds.
+
+  Raises
+	------
+	AssertionError
+		If importing takes longer than importTimeBudget, or has a side effect
+  '''
+  # Only needed here, so it isn't imported with everything else
+  import subprocess
+
+  moduleDir, moduleFname = os.path.split(os.path.abspath(__file__))
+  importCode = f"""import sys, time, logging
+timeStart = time.perf_counter()
+import {os.path.splitext(moduleFname)[0]} as module
+print(time.perf_counter() - timeStart, "numpy" in sys.modules, len(logging.getLogger().handlers), len(module.bracketTables))"""
+
+  importTimes = []
+  for runIdx in range(runCount):
+    result = subprocess.run([sys.executable, "-c", importCode], cwd=moduleDir, capture_output=True, text=True, check=True)
+    importTime, importedNumPy, handlerCount, tableCount = result.stdout.split()
+    importTimes.append(float(importTime))
+
+    assert importedNumPy == "False", "Importing doesn't import NumPy"
+    assert handlerCount == "0", "Importing doesn't set up logging"
+    assert tableCount == "0", "Importing doesn't load a tax table"
 
-  logging.info(f"Income tax calculated from getTotalIncomeTax: {incomeTax}")
-  
-  return round(incomeTax, 5)
-
-logging.debug(f"Testing functions using assertions...")
-
-# Assertions to test the percentageToDecimal function
-assert percentageToDecimal(50) == 0.5, "50% is 0.5"
-assert percentageToDecimal(25) == 0.25, "25% is 0.25"
-assert percentageToDecimal(0.5) == 0.005, "0.5% is 0.005"
-assert percentageToDecimal(83.9322) == 0.83932, "83.9322% rounded to 5 decimal points is 0.83932"
-assert percentageToDecimal(43.2934) == 0.43293, "43.2934% rounded to 5 decimal points is 0.43293"
-assert percentageToDecimal(10) == 0.1, "10% is 0.1"
-assert percentageToDecimal(0.101) == 0.00101, "10% is 0.1"
-assert percentageToDecimal(9.39) == 0.0939, "9.39% is 0.0939"
-
-# Assertions to test the getTaxableAmount function
-assert getTaxableAmount("Employment", 50000)[1] == 50000, "Employment income has a tax rate of 100%"
-assert getTaxableAmount("Eligible Dividends", 50000)[1] == 50000, "Eligible dividends income has a tax rate of 100%"
-assert getTaxableAmount("Capital Gains", 80000)[1] == 40000, "Capital gains income has a tax rate of 50%"
-assert getTaxableAmount("Rental Income", 25394)[1] == 9649.72, "Rental income has a tax rate of 38%"
-assert getTaxableAmount("Inheritance", 94203)[1] == 0, "Inheritance has a tax rate of 0%"
-assert getTaxableAmount("Other Non-Taxable Income", 213123)[1] == 0, "Other Non-Taxable Income has a tax rate of 0%"
-assert getTaxableAmount("Other Taxable Income (EI, CERB, etc.)", 1392)[1] == 1392, "Other Non-Taxable Income has a tax rate of 100%"
-assert getTaxableAmount("Taxable Scholarships", 1030)[1] == 1030, "Taxable Scholarships have a tax rate of 100%"
-
-# Assertions to test the getTotalIncomeTax function
-assert getTotalIncomeTax(50000) == 7553.9, "Income tax on $50000 is $7553.9"
-assert getTotalIncomeTax(0) == 0, "Income tax on $0 is $0"
-assert getTotalIncomeTax(100000) == 17803.9, "Income tax on $100000 is $17803.9"
-assert getTotalIncomeTax(394034) == 94514.32, "Income tax on $50000, rounded to 5 decimal points, is $94514.32"
-assert getTotalIncomeTax(3039281928) == 1002922658.74, "Income tax on $3039281928, rounded to 5 decimal points, is $1002922658.74"
-assert getTotalIncomeTax(1) == 0.15, "Income tax on $1 is $0.15"
-assert getTotalIncomeTax(192032) == 39143.92, "Income tax on $192032 is $39143.92"
-assert getTotalIncomeTax(250) == 37.5, "Income tax on $250 is $37.5"
-
-logging.debug(f"Done testing functions!")
+  assert min(importTimes) <= importTimeBudget, f"Importing takes {min(importTimes):.3f}s, more than the budget of {importTimeBudget}s"
+
+  return min(importTimes)
 
 if __name__ == "__main__":
+  # Set up logging
+  setUpLogging()
+
+  # python main.py --verify runs the tests instead of the program
+  if sys.argv[1:] == ["--verify"]:
+    runSelfTests()
+    importTime = checkImportTime()
+    print(f"All tests passed, importing took {importTime * 1000:.1f}ms (budget: {importTimeBudget * 1000:.0f}ms)")
+    sys.exit(0)
+
+  incomeTaxRates = getDefaultTaxTable()["incomeTaxRates"]
   taxableIncome = 0
   totalIncome = 0
   
@@ -403,9 +1642,10 @@ if __name__ == "__main__":
   print(f"Total taxable income: ${taxableIncome:,.2f}")
   logging.info(f"Total taxable income: {taxableIncome}")
   
-  # Calculate amount of income tax
+  # Calculate amount of income tax, before and after the BPA credit
   try:
     incomeTax = getTotalIncomeTax(taxableIncome)
+    incomeTaxAfterBPA = getIncomeTaxAfterBasicPersonalAmount(taxableIncome)
   except Exception as e:
     logging.error(f"Something went wrong while calculating income tax: {str(e)}")
     print(f"Something went wrong while calculating income tax: {str(e)}")
@@ -414,26 +1654,7 @@ if __name__ == "__main__":
   # Display total income tax without any deductions
   print(f"Total income tax (w/o Basic Personal Amount): ${incomeTax:,.2f}")
   
-  totalDeductions = 0
-  # Account for BPA
-  if taxableIncome <= 151978:
-    totalDeductions += 13808
-  elif taxableIncome >= 216511:
-    totalDeductions += 12421
-  else:
-    # Federal Worksheet doesn't tell you what the basic personal amount is for incomes between 151K and 216K, just tells you to "use the federal worksheet"...
-    # Due to that, this is probably incorrect, as it's just an average between the two. 
-    totalDeductions += 13114.5
-  
-  logging.info(f"Deductions after Basic Personal Amount: {totalDeductions}")
-  
-  # Federal non-refundable tax credit rate is 15%
-  incomeTax -= totalDeductions * 0.15
-  
-  # Make sure it doesn't drop below 0
-  incomeTax = max(incomeTax, 0)
-  
-  logging.info(f"Total amount of income tax: {incomeTax}")
+  incomeTax = incomeTaxAfterBPA
   
   # Round to 2 decimal points
   roundedIncomeTax = round(incomeTax, 2)
@@ -453,18 +1674,14 @@ if __name__ == "__main__":
   # Only run if they want to
   if shouldEarnMore == "yes":
     logging.info("Calculating income tax with 30% more taxable income...")
-    # Reset variables
-    incomeTax = 0
-    totalDeductions = 0
-    roundedIncomeTax = 0
-  
     taxableIncome *= 1.3
     print(f"30% added to current taxable income: ${taxableIncome:,.2f}")
     logging.info(f"30% added to taxable income: {taxableIncome}")
   
-    # Calculate amount of income tax
+    # Calculate amount of income tax, before and after the BPA credit
     try:
       incomeTax = getTotalIncomeTax(taxableIncome)
+      incomeTaxAfterBPA = getIncomeTaxAfterBasicPersonalAmount(taxableIncome)
     except Exception as e:
       logging.error(f"Something went wrong while calculating income tax: {str(e)}")
       print(f"Something went wrong while calculating income tax: {str(e)}")
@@ -474,24 +1691,7 @@ if __name__ == "__main__":
     print(f"Total income tax (w/30% extra income, w/o Basic Personal Amount): ${incomeTax:,.2f}")
     logging.info(f"Total income tax (w/30% extra income, w/o Basic Personal Amount): ${incomeTax}")
     
-    totalDeductions = 0
-    # Account for BPA
-    if taxableIncome <= 151978:
-      totalDeductions += 13808
-    elif taxableIncome >= 216511:
-      totalDeductions += 12421
-    else:
-      # Federal Worksheet doesn't tell you what the basic personal amount is for incomes between 151K and 216K, just tells you to "use the federal worksheet"...
-      # Due to that, this is probably incorrect, as it's just an average between the two. 
-      totalDeductions += 13114.5
-    
-    logging.info(f"Deductions after Basic Personal Amount: {totalDeductions}")
-    
-    # Federal non-refundable tax credit rate is 15%
-    incomeTax -= totalDeductions * 0.15
-    
-    # Make sure it doesn't drop below 0
-    incomeTax = max(incomeTax, 0)
+    incomeTax = incomeTaxAfterBPA
     
     logging.info(f"Total amount of income tax (w/30% more income): {incomeTax}")
     
@@ -501,4 +1701,4 @@ if __name__ == "__main__":
     # Print final income tax
     print(f"Total income tax (w/ BPA deduction & 30% more income): ${roundedIncomeTax:,.2f}")
 
-logging.debug("Program has ended.")
+  logging.debug("Program has ended.")
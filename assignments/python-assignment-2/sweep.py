@@ -0,0 +1,145 @@
+#-----------------------------------------------------------------------------
+# Name:        Tax Software (sweep.py)
+# Purpose:     see how federal income tax changes as taxable income goes up
+#
+# Author:      Aritro Saha
+# Created:     19-Oct-2026
+# Updated:     19-Oct-2026
+#-----------------------------------------------------------------------------
+
+from typing import Dict, List, Union
+from time import perf_counter
+import argparse
+import logging
+
+from main import getTaxCurves, toCents, np, setUpLogging
+
+# Columns written for every amount of taxable income, in the order they're written
+curveColumns = ["taxableIncome", "incomeTax", "incomeTaxAfterBPA", "afterTaxIncome", "effectiveRate", "marginalRate"]
+
+def sweepIncomes(start: Union[int, float], stop: Union[int, float], step: Union[int, float], bracketTableName: str = "federal") -> Dict[str, object]:
+  '''
+  Gets the tax curves for every amount of taxable income from start to stop.
+
+  Gets the tax curves (with getTaxCurves) from start to stop (including stop, if a step lands on it), going up by step each time. The amounts are counted in cents, so there's no drift from adding up floats.
+
+  Parameters
+  ----------
+  start : int or float
+    The first amount of taxable income.
+  stop : int or float
+    The last amount of taxable income.
+  step : int or float
+    How much the taxable income goes up by each time (at least 1 cent).
+  bracketTableName : str
+    The name of the tax table to use (which can be a combined one, like "2021-federal+2021-ontario"), the federal one by default.
+
+  Returns
+  -------
+  dict[str, numpy.ndarray]
+    The curves, with the same keys as getTaxCurves.
+
+  Raises
+	------
+	ValueError
+		If step is less than 1 cent, or stop is below start
+  '''
+  logging.info("Running sweepIncomes(%s, %s, %s, '%s')", start, stop, step, bracketTableName)
+
+  if toCents(step) < 1:
+    logging.error("step must be at least 1 cent")
+    raise ValueError("step must be at least 1 cent")
+
+  if stop < start:
+    logging.error("stop cannot be below start")
+    raise ValueError("stop cannot be below start")
+
+  incomeCents = np.arange(toCents(start), toCents(stop) + 1, toCents(step))
+
+  return getTaxCurves(incomeCents / 100, bracketTableName)
+
+def sweepMultipliers(taxableIncome: Union[int, float], multipliers: List[float], bracketTableName: str = "federal") -> Dict[str, object]:
+  '''
+  Gets the tax curves for an amount of taxable income scaled by each multiplier.
+
+  Answers "what if I earned 30% more?" for many percentages at once, like multipliers of 0.5 to 2 for earning half as much up to twice as much.
+
+  Parameters
+  ----------
+  taxableIncome : int or float
+    The amount of taxable income to scale.
+  multipliers : list[float]
+    What to multiply the taxable income by (1.3 for 30% more).
+  bracketTableName : str
+    The name of the tax table to use (which can be a combined one, like "2021-federal+2021-ontario"), the federal one by default.
+
+  Returns
+  -------
+  dict[str, numpy.ndarray]
+    The curves, with the same keys as getTaxCurves, plus "multiplier".
+  '''
+  logging.info("Running sweepMultipliers(%s, %d multipliers, '%s')", taxableIncome, len(multipliers), bracketTableName)
+
+  multipliers = np.asarray(multipliers, dtype=np.float64)
+  curves = getTaxCurves(taxableIncome * multipliers, bracketTableName)
+  curves["multiplier"] = multipliers
+
+  return curves
+
+def writeCurves(curves: Dict[str, object], fname: str) -> None:
+  '''
+  Writes tax curves to a CSV file.
+
+  Writes one row per amount of taxable income, with the columns in curveColumns (and the multiplier first, if there is one). Amounts are written to the cent and rates to 6 decimal points.
+
+  Parameters
+  ----------
+  curves : dict[str, numpy.ndarray]
+    The curves from sweepIncomes or sweepMultipliers.
+  fname : str
+    The name of the CSV file to write.
+  '''
+  logging.info("Running writeCurves('%s')", fname)
+
+  columns = (["multiplier"] if "multiplier" in curves else []) + curveColumns
+  formats = ["%.6f" if column.endswith(("Rate", "multiplier")) else "%.2f" for column in columns]
+
+  # savetxt formats the whole table at once instead of going through csv one row at a time
+  np.savetxt(fname, np.column_stack([curves[column] for column in columns]), fmt=formats, delimiter=",",
+             header=",".join(columns), comments="")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="See how federal income tax changes as taxable income goes up.")
+  parser.add_argument("--start", type=float, default=0)
+  parser.add_argument("--stop", type=float, default=1000000)
+  parser.add_argument("--step", type=float, default=1)
+  parser.add_argument("--income", type=float, help="scale this taxable income by --multipliers instead of sweeping from --start to --stop")
+  parser.add_argument("--multipliers", type=float, nargs="+", default=[1.3])
+  parser.add_argument("--table", default="federal", help='tax table to use, like "2022-federal" or "2021-federal+2021-ontario" for federal and provincial tax together')
+  parser.add_argument("--output", help="CSV file to write the curves to")
+  args = parser.parse_args()
+
+  if np is None:
+    parser.error("NumPy is needed for sweeping")
+
+  setUpLogging(level=logging.WARNING)
+
+  timeStart = perf_counter()
+  if args.income is not None:
+    curves = sweepMultipliers(args.income, args.multipliers, args.table)
+  else:
+    curves = sweepIncomes(args.start, args.stop, args.step, args.table)
+  timeEnd = perf_counter()
+
+  pointCount = curves["taxableIncome"].size
+  print(f"Swept {pointCount:,} amounts of taxable income in {timeEnd - timeStart:.3f}s")
+
+  # The highest effective rate, and where the marginal rate changes
+  print(f"Highest effective rate: {curves['effectiveRate'].max():.2%}")
+  marginalChanges = np.flatnonzero(np.diff(curves["marginalRate"])) + 1
+  for changeIdx in marginalChanges:
+    print(f"Marginal rate goes to {curves['marginalRate'][changeIdx]:.2%} at ${curves['taxableIncome'][changeIdx]:,.2f}")
+
+  if args.output:
+    writeCurves(curves, args.output)
+    print(f"Wrote the curves to {args.output}")